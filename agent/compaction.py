@@ -0,0 +1,158 @@
+import json
+import re
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from engines.urls import canonicalize_url
+
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯＀-￯　-〿]")
+# 粗略估计：中日韩字符约 1 token/字，其余约 4 字符/token
+LATIN_CHARS_PER_TOKEN = 4
+
+_current_ledger: ContextVar[Optional["TokenLedger"]] = ContextVar("token_ledger", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate without a tokenizer: CJK characters count one each, other text four characters per token."""
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + -(-(len(text) - cjk) // LATIN_CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut `text` to at most `budget` estimated tokens, preferring a line or sentence boundary."""
+    total = estimate_tokens(text)
+    if total <= budget:
+        return text
+    if budget <= 0:
+        return ""
+    cut = int(len(text) * budget / total)
+    while cut > 0 and estimate_tokens(text[:cut]) > budget:
+        cut = int(cut * 0.9)
+    head = text[:cut]
+    boundary = max(head.rfind("\n"), head.rfind("。"), head.rfind(". "))
+    if boundary > cut * 0.8:
+        head = head[:boundary + 1]
+    return head.rstrip() + "…"
+
+
+def split_budget(costs: List[int], budget: int) -> List[int]:
+    """Share `budget` among items; items needing less than an equal share pass the rest on."""
+    shares = [0] * len(costs)
+    left = budget
+    order = sorted(range(len(costs)), key=costs.__getitem__)
+    for position, index in enumerate(order):
+        share = min(costs[index], left // (len(order) - position))
+        shares[index] = share
+        left -= share
+    return shares
+
+
+def compact_search_results(results: Dict[str, list], budget: int) -> str:
+    """Search results deduplicated across questions by canonical URL, as compact text within `budget` tokens.
+
+    Results are taken rank by rank across questions, so when the budget runs out every
+    question keeps its best hits; summaries share what is left after titles and URLs.
+    """
+    seen = set()
+    entries = []
+    columns = [(question, items) for question, items in results.items() if items]
+    for rank in range(max((len(items) for _, items in columns), default=0)):
+        for question, items in columns:
+            if rank >= len(items):
+                continue
+            item = items[rank]
+            if item.get("url"):
+                key = canonicalize_url(item["url"])
+                if key in seen:
+                    continue
+                seen.add(key)
+            head = " | ".join(str(item[field]).strip() for field in ("title", "publisher", "time") if item.get(field))
+            meta = "\n".join(line for line in (head, item.get("url")) if line)
+            entries.append((question, meta, (item.get("summary") or "").strip()))
+
+    overhead = sum(estimate_tokens(question) + 2 for question, _ in columns)
+    meta_costs = [estimate_tokens(meta) + 4 for _, meta, _ in entries]
+    # 标题和链接都放不下时，先舍弃排名靠后的结果
+    while entries and overhead + sum(meta_costs) > budget:
+        entries.pop()
+        meta_costs.pop()
+    shares = split_budget([estimate_tokens(summary) for _, _, summary in entries], budget - overhead - sum(meta_costs))
+
+    picked: Dict[str, list] = {}
+    for (question, meta, summary), share in zip(entries, shares):
+        summary = truncate_to_tokens(summary, share)
+        picked.setdefault(question, []).append("\n".join(line for line in (meta, summary) if line))
+    blocks = []
+    for question, _ in columns:
+        if question in picked:
+            blocks.append(f"## {question}\n" + "\n\n".join(f"[{i}] {entry}" for i, entry in enumerate(picked[question], 1)))
+    return "\n\n".join(blocks)
+
+
+def compact_pages(pages: List[dict], budget: int) -> str:
+    """Crawled pages deduplicated by canonical URL, as compact text within `budget` tokens in total."""
+    seen = set()
+    unique = []
+    for page in pages:
+        content = (page.get("content") or "").strip()
+        key = canonicalize_url(page.get("url") or "")
+        if content and key not in seen:
+            seen.add(key)
+            unique.append((page["url"], content))
+
+    costs = [estimate_tokens(content) for _, content in unique]
+    overhead = sum(estimate_tokens(url) + 4 for url, _ in unique)
+    shares = split_budget(costs, max(0, budget - overhead))
+    blocks = []
+    for i, ((url, content), share) in enumerate(zip(unique, shares), 1):
+        text = truncate_to_tokens(content, share)
+        if text:
+            blocks.append(f"[{i}] {url}\n{text}")
+    return "\n\n".join(blocks)
+
+
+class TokenLedger:
+    """Estimated tokens of tool outputs before and after compaction within one request."""
+
+    def __init__(self):
+        self.calls: List[dict] = []
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_ledger.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_ledger.reset(self._token)
+
+    def record(self, tool: str, before: int, after: int) -> dict:
+        entry = {"tool": tool, "tokens_before": before, "tokens_after": after}
+        self.calls.append(entry)
+        return entry
+
+    def totals(self) -> dict:
+        before = sum(call["tokens_before"] for call in self.calls)
+        after = sum(call["tokens_after"] for call in self.calls)
+        return {"calls": len(self.calls), "tokens_before": before, "tokens_after": after}
+
+
+def current_ledger() -> Optional[TokenLedger]:
+    return _current_ledger.get()
+
+
+def compact(tool: str, raw, budget: int) -> Tuple[str, Optional[dict]]:
+    """Compact a tool's raw output and record the token counts in the request's ledger.
+
+    Returns the text and this call's ledger entry (None outside a ledger scope).
+    """
+    if tool == "web_search":
+        text = compact_search_results(raw, budget)
+    else:
+        text = compact_pages(raw, budget)
+    before = estimate_tokens(json.dumps(raw, ensure_ascii=False))
+    after = estimate_tokens(text)
+    ledger = current_ledger()
+    # 并行的工具调用共用一个 ledger，只能用本次调用返回的条目，不能取 calls[-1]
+    entry = ledger.record(tool, before, after) if ledger is not None else None
+    return text, entry
@@ -1,14 +1,19 @@
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph, MessagesState
 from langgraph.prebuilt import ToolNode
-from typing import Literal
+from typing import AsyncIterator, Literal
 from datetime import datetime
 from dotenv import load_dotenv
+import asyncio
 import os
 from agent.tools import WebTools
 from .prompt import prompts
+from .router import route
+from runtime.deadline import DeadlineExceeded, remaining
+from runtime.metrics import LLM_TOKENS, span
+from loguru import logger
 load_dotenv()
 def get_datetime_str():
     now = datetime.now()
@@ -17,25 +22,28 @@ def get_datetime_str():
 
 class ToolsGraph:
 
-    def __init__(self, browser_pool, crawler_pool, engine):
+    def __init__(self, browser_pool, crawler_pool, engine, search_options=None, serp_cache=None, prefetch_top_n=0, token_budgets=None, content_cache=None):
         self.browser_pool = browser_pool
         self.crawler_pool = crawler_pool
         self.engine = engine
-        self.ts_manage = WebTools(browser_pool=self.browser_pool, crawler_pool=crawler_pool, engine=self.engine)
+        self.ts_manage = WebTools(browser_pool=self.browser_pool, crawler_pool=crawler_pool, engine=self.engine, search_options=search_options, serp_cache=serp_cache, prefetch_top_n=prefetch_top_n, token_budgets=token_budgets, content_cache=content_cache)
         self.tools = [self.ts_manage.web_search, self.ts_manage.link_parser]
         self.tool_node = ToolNode(self.tools)
+        self.model_name = os.getenv("MODEL_NAME")
         self.llm = ChatOpenAI(
-            model=os.getenv("MODEL_NAME"),
+            model=self.model_name,
             openai_api_key=os.getenv("OPENAI_API_KEY"),
             base_url=os.getenv("OPENAI_BASE_URL"),
-            streaming=False,
+            # 不强制 streaming=False：ainvoke 仍一次性返回，astream_events 时按 token 流式输出
             temperature=0,
         ).bind_tools(self.tools)
         workflow = StateGraph(MessagesState)
+        workflow.add_node("router", self.route_input)
         workflow.add_node("agent", self.call_model)
         workflow.add_node("tools",  self.tool_node)
-        # 设定入口为 agent
-        workflow.add_edge(START, "agent")
+        # 设定入口为 router：纯 URL 等确定性输入直接调用工具，省去一次 LLM 决策
+        workflow.add_edge(START, "router")
+        workflow.add_conditional_edges("router", self.after_route)
         # 条件边：决定是否继续调用工具
         workflow.add_conditional_edges("agent",  self.should_continue)
         # 设置普通边：agent 到 agent
@@ -48,16 +56,71 @@ class ToolsGraph:
         last = messages[-1]
         return "tools" if last.tool_calls else END
 
+    def route_input(self, state: MessagesState):
+        tool_call = route(state["messages"][-1].content)
+        if tool_call is None:
+            return {"messages": []}
+        return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
+
+    def after_route(self, state: MessagesState) -> Literal["tools", "agent"]:
+        last = state["messages"][-1]
+        return "tools" if isinstance(last, AIMessage) and last.tool_calls else "agent"
+
     async def call_model(self, state: MessagesState):
         messages = state["messages"]
-        print(messages)
-        response = await self.llm.ainvoke(messages)
+        logger.debug(f"calling model with {len(messages)} messages")
+        # 模型调用也受请求截止时间约束
+        try:
+            with span("llm", model=self.model_name):
+                response = await asyncio.wait_for(self.llm.ainvoke(messages), remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("request deadline exceeded while waiting for the model")
+        usage = response.usage_metadata or {}
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), model=self.model_name, kind="input")
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), model=self.model_name, kind="output")
         return {"messages": [response]}
 
+    def build_inputs(self, question):
+        return {"messages": [SystemMessage(content=prompts["web_prompt"] + f"\n当前时间：{get_datetime_str()}"),HumanMessage(content=question)]}
+
     async def run(self, question):
-        inputs = {"messages": [SystemMessage(content=prompts["web_prompt"] + f"\n当前时间：{get_datetime_str()}"),HumanMessage(content=question)]}
-        final_state = await self.graph.ainvoke(inputs)
-        for i in final_state["messages"]:
-            print(i)
+        inputs = self.build_inputs(question)
+        async with self.ts_manage.request_scope():
+            final_state = await self.graph.ainvoke(inputs)
         return final_state["messages"][-1].content
 
+    async def stream(self, question) -> AsyncIterator[dict]:
+        """Run the graph and yield events as they happen.
+
+        Yields `{"event": ..., "data": ...}` dicts:
+          - progress: a tool started/finished, or a stage inside a tool completed
+          - token: a piece of model output text
+          - done: the final answer
+        Closing the generator cancels the remaining graph work.
+        """
+        answer = []
+        async with self.ts_manage.request_scope() as scope:
+            events = self.graph.astream_events(self.build_inputs(question), version="v2")
+            try:
+                async for event in events:
+                    kind = event["event"]
+                    if kind == "on_chat_model_start":
+                        # 每轮模型调用重新累计，最后一轮即最终答案
+                        answer = []
+                    elif kind == "on_chat_model_stream":
+                        content = event["data"]["chunk"].content
+                        if isinstance(content, str) and content:
+                            answer.append(content)
+                            yield {"event": "token", "data": {"content": content}}
+                    elif kind == "on_tool_start":
+                        yield {"event": "progress", "data": {"stage": "tool_start", "tool": event["name"], "input": event["data"].get("input")}}
+                    elif kind == "on_tool_end":
+                        yield {"event": "progress", "data": {"stage": "tool_end", "tool": event["name"]}}
+                    elif kind == "on_custom_event" and event["name"] == "progress":
+                        yield {"event": "progress", "data": event["data"]}
+            finally:
+                await events.aclose()
+        if scope.prefetch is not None and scope.prefetch.stats["prefetched"]:
+            yield {"event": "progress", "data": {"stage": "prefetch", **scope.prefetch.stats}}
+        yield {"event": "progress", "data": {"stage": "tokens", **scope.tokens.totals()}}
+        yield {"event": "done", "data": {"answer": "".join(answer)}}
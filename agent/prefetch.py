@@ -0,0 +1,164 @@
+import asyncio
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from engines.urls import canonicalize_url
+from pools import CrawlScheduler
+
+_current_store: ContextVar[Optional["PrefetchStore"]] = ContextVar("prefetch_store", default=None)
+
+
+def current_store() -> Optional["PrefetchStore"]:
+    """The prefetch store of the running request, or None outside a request scope."""
+    return _current_store.get()
+
+
+def top_urls(results: Dict[str, list], n: int) -> List[str]:
+    """The first `n` distinct result URLs, taken rank by rank across all questions."""
+    urls = {}
+    columns = [items for items in results.values() if items]
+    for rank in range(max((len(items) for items in columns), default=0)):
+        for items in columns:
+            if rank < len(items) and items[rank].get("url"):
+                urls.setdefault(canonicalize_url(items[rank]["url"]), items[rank]["url"])
+                if len(urls) >= n:
+                    return list(urls.values())
+    return list(urls.values())
+
+
+class PrefetchStore:
+    """Pages crawled speculatively for one request, keyed by canonical URL.
+
+    `start` crawls URLs in the background through the scheduler, `claim` hands the in-flight
+    or finished results to link_parser, and `close` cancels whatever is still running.
+    Used as an async context manager, the store is the current one for the enclosed code.
+    """
+
+    def __init__(self, scheduler: CrawlScheduler):
+        self.scheduler = scheduler
+        self.futures: Dict[str, asyncio.Future] = {}
+        self.claimed = set()
+        self.tasks: List[asyncio.Task] = []
+        self.stats: Optional[dict] = None
+        self._token = None
+
+    async def __aenter__(self):
+        self._token = _current_store.set(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        _current_store.reset(self._token)
+        await self.close()
+
+    def start(self, urls: List[str]):
+        loop = asyncio.get_running_loop()
+        batch = {}
+        for url in urls:
+            key = canonicalize_url(url)
+            if key not in self.futures and url not in batch:
+                self.futures[key] = loop.create_future()
+                batch[url] = key
+        if batch:
+            self.tasks.append(asyncio.create_task(self._crawl(batch)))
+
+    async def _crawl(self, batch: Dict[str, str]):
+        def resolve(report, page):
+            future = self.futures[batch[report.url]]
+            if not future.done():
+                future.set_result(page)
+
+        stream = self.scheduler.stream(list(batch), on_done=resolve)
+        try:
+            async for _ in stream:
+                pass
+        except Exception as e:
+            logger.warning(f"prefetch failed: {e!r}")
+        finally:
+            await stream.aclose()
+            # 爬取未能开始的 URL 也要结束等待
+            for key in batch.values():
+                if not self.futures[key].done():
+                    self.futures[key].set_result(None)
+
+    def claim(self, urls: List[str]) -> Tuple[Dict[str, asyncio.Future], List[str]]:
+        """Split `urls` into prefetched futures and URLs that still have to be crawled."""
+        claimed, remaining = {}, []
+        for url in urls:
+            key = canonicalize_url(url)
+            future = self.futures.get(key)
+            # 预取已失败的 URL 交还给 link_parser 重新爬取
+            if future is None or future.cancelled() or (future.done() and future.result() is None):
+                remaining.append(url)
+            else:
+                claimed[url] = future
+                self.claimed.add(key)
+        return claimed, remaining
+
+    def unclaim(self, url: str):
+        """A claimed prefetch turned out empty; link_parser crawls `url` itself."""
+        self.claimed.discard(canonicalize_url(url))
+
+    async def close(self) -> dict:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        prefetched = len(self.futures)
+        hits = len(self.claimed)
+        self.stats = {
+            "prefetched": prefetched,
+            "hits": hits,
+            "wasted": prefetched - hits,
+            "hit_ratio": hits / prefetched if prefetched else 0.0,
+        }
+        return self.stats
+
+
+async def merge_pages(
+        futures: Dict[str, asyncio.Future],
+        stream: AsyncIterator[dict],
+        recrawl: Callable[[List[str]], AsyncIterator[dict]],
+) -> AsyncIterator[dict]:
+    """Yield pages from prefetch futures (keyed by URL) and from `stream` in completion order.
+
+    A prefetch that ends without a page (failed or cancelled) is crawled again through
+    `recrawl([url])` instead of being dropped.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    urls = {future: url for url, future in futures.items()}
+    for future in futures.values():
+        future.add_done_callback(queue.put_nowait)
+
+    async def pump(source: AsyncIterator[dict]):
+        try:
+            async for page in source:
+                queue.put_nowait(page)
+        except Exception as e:
+            logger.warning(f"link_parser crawl failed: {e!r}")
+        finally:
+            await source.aclose()
+            queue.put_nowait(None)
+
+    pump_tasks = [asyncio.create_task(pump(stream))]
+    remaining = len(futures) + 1
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is None:
+                remaining -= 1
+            elif isinstance(item, asyncio.Future):
+                remaining -= 1
+                if not item.cancelled() and item.result() is not None:
+                    # 交出副本，重排会改写页面内容
+                    yield dict(item.result())
+                else:
+                    # 预取失败或被取消，放回 link_parser 自己的爬取中
+                    remaining += 1
+                    pump_tasks.append(asyncio.create_task(pump(recrawl([urls[item]]))))
+            else:
+                yield item
+    finally:
+        for task in pump_tasks:
+            task.cancel()
+        await asyncio.gather(*pump_tasks, return_exceptions=True)
+        for future in futures.values():
+            future.remove_done_callback(queue.put_nowait)
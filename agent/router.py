@@ -0,0 +1,40 @@
+import re
+import uuid
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# URL 以空白、引号、尖括号或中文标点结束
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'，。；！？、（）【】《》「」]+", re.IGNORECASE)
+TRAILING_PUNCTUATION = ".,;:!?)]}"
+
+
+def extract_urls(text: str) -> Tuple[List[str], str]:
+    """Split `text` into the valid http(s) URLs it contains and the remaining text."""
+    urls = []
+    for match in URL_PATTERN.finditer(text):
+        url = match.group().rstrip(TRAILING_PUNCTUATION)
+        try:
+            host = urlsplit(url).hostname or ""
+        except ValueError:
+            # 如 "http://[abc" 这样不完整的 IPv6 主机，跳过交给模型处理
+            continue
+        if "." in host and url not in urls:
+            urls.append(url)
+    rest = URL_PATTERN.sub(" ", text)
+    return urls, " ".join(rest.split())
+
+
+def route(question: str) -> Optional[dict]:
+    """A tool call for inputs whose intent needs no model decision, else None.
+
+    - only URLs: parse the pages with `link_parser`
+    - URLs plus text: parse the pages and rerank them against the text
+    """
+    urls, rest = extract_urls(question)
+    if not urls:
+        return None
+    args = {"urls": urls}
+    # 只剩标点时视为纯 URL 输入
+    if re.search(r"\w", rest):
+        args["query"] = rest
+    return {"name": "link_parser", "args": args, "id": f"call_route_{uuid.uuid4().hex[:24]}", "type": "tool_call"}
@@ -1,10 +1,46 @@
-from engines import BingSearch, QuarkSearch, BaiduSearch, SougouSearch
-from reranker import OpenAIEmbeddingReranker, Chunker
-from typing import List, Optional
+from engines import BingSearch, QuarkSearch, BaiduSearch, SougouSearch, MetaSearch
+from engines.urls import canonicalize_url
+from reranker import OpenAIEmbeddingReranker, BM25Reranker, HybridReranker, chunk_text
+from caches import SerpCache, CachedSearch, EmbeddingCache, ContentCache
+from pools import CrawlScheduler
+from runtime.deadline import clamp
+from runtime.executor import get_executor
+from runtime.metrics import span
+from .prefetch import PrefetchStore, current_store, top_urls, merge_pages
+from .compaction import TokenLedger, compact
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
 from langchain_core.tools import StructuredTool
+from langchain_core.callbacks import adispatch_custom_event
 from pydantic import BaseModel
+from loguru import logger
+import asyncio
+import os
 
-reranker = OpenAIEmbeddingReranker()
+
+def build_reranker():
+    # RERANKER_BACKEND: embedding（默认）| bm25（纯本地）| hybrid（BM25 预筛 + 向量重排）
+    # 返回 (reranker, 向量缓存)，纯本地时没有向量缓存
+    backend = os.getenv("RERANKER_BACKEND", "embedding")
+    if backend == "bm25":
+        return BM25Reranker(), None
+    cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings"))
+    embedding = OpenAIEmbeddingReranker(cache=cache)
+    if backend == "hybrid":
+        return HybridReranker(embedding, prefilter_top_n=int(os.getenv("RERANKER_PREFILTER_TOP_N", "50"))), cache
+    return embedding, cache
+
+
+reranker, embedding_cache = build_reranker()
+
+
+async def report_progress(stage: str, **data):
+    """Emit a progress event to `astream_events` consumers; a no-op outside a graph run."""
+    try:
+        await adispatch_custom_event("progress", {"stage": stage, **data})
+    except RuntimeError:
+        pass
 
 
 class WebSearchArgsSchema(BaseModel):
@@ -15,62 +51,199 @@ class QuarkSearchArgsSchema(BaseModel):
 
 class LinkParserArgsSchema(BaseModel):
     urls: List[str]
+    query: Optional[str] = None
+
+@dataclass
+class RequestScope:
+    tokens: TokenLedger
+    prefetch: Optional[PrefetchStore] = None
+
 
 class WebTools():
 
-    def __init__(self, browser_pool, crawler_pool, engine):
+    def __init__(
+            self,
+            browser_pool,
+            crawler_pool,
+            engine,
+            search_options: Optional[dict] = None,
+            serp_cache: Optional[SerpCache] = None,
+            crawl_deadline: float = 30.0,
+            rerank_grace: float = 3.0,
+            rerank_window: float = 0.2,
+            prefetch_top_n: int = 0,
+            token_budgets: Optional[Dict[str, int]] = None,
+            content_cache: Optional[ContentCache] = None,
+    ):
         self.browser_pool = browser_pool
         self.crawler_pool = crawler_pool
         self.engine = engine
+        # 透传给搜索引擎的参数，如 concurrency、fetch_mode="direct"
+        self.search_options = search_options or {}
+        self.serp_cache = serp_cache
+        self.embedding_cache = embedding_cache
+        # link_parser 的整体时限；超时后只返回已完成的页面，重排额外宽限 rerank_grace 秒
+        self.crawl_deadline = crawl_deadline
+        self.rerank_grace = rerank_grace
+        # 第一个页面到达后再等 rerank_window 秒，期间爬完的页面合成一批切分重排
+        self.rerank_window = rerank_window
+        # 把 URL 分散到池中所有 crawler，并按域名限流；已缓存的页面不再爬取
+        self.crawl_scheduler = CrawlScheduler(crawler_pool, content_cache=content_cache)
+        # 投机预取：搜索结果返回后立即在后台爬取前 N 个链接，0 表示关闭
+        self.prefetch_top_n = prefetch_top_n
+        self.prefetch_totals = {"prefetched": 0, "hits": 0, "wasted": 0}
+        # 每次工具调用写回 LLM 上下文的 token 上限（估算值）
+        self.token_budgets = {"web_search": 2000, "link_parser": 6000, **(token_budgets or {})}
         self.web_search = StructuredTool(
             name='web_search',
             description='网络搜索功能，模拟搜索引擎，专门解决实时类问题的查询。',
             args_schema=WebSearchArgsSchema,
-            coroutine=self.web_search_function  # 协程函数
+            coroutine=self.web_search_tool  # 协程函数
         )
 
         self.link_parser = StructuredTool(
             name='link_parser',
             description='用于解析url，获取网页链接的内容，其中urls为链接，query为用户在工具‘web_search’输入的查询。',
             args_schema=LinkParserArgsSchema,
-            coroutine=self.link_parser_function
+            coroutine=self.link_parser_tool
         )
 
+    @asynccontextmanager
+    async def request_scope(self):
+        """Scope of one user request; per-request state lives only inside it.
+
+        Yields a RequestScope with the request's TokenLedger and PrefetchStore (None when
+        prefetching is off). On exit unclaimed prefetches are cancelled, the hit/waste counts
+        are added to `prefetch_totals`, and the token counts are logged.
+        """
+        scope = RequestScope(tokens=TokenLedger())
+        try:
+            async with AsyncExitStack() as stack:
+                stack.enter_context(scope.tokens)
+                if self.prefetch_top_n:
+                    scope.prefetch = await stack.enter_async_context(PrefetchStore(self.crawl_scheduler))
+                yield scope
+        finally:
+            if scope.prefetch is not None and scope.prefetch.stats:
+                stats = scope.prefetch.stats
+                for key in self.prefetch_totals:
+                    self.prefetch_totals[key] += stats[key]
+                if stats["prefetched"]:
+                    logger.info(f"prefetch: {stats['hits']}/{stats['prefetched']} used, {stats['wasted']} wasted")
+            totals = scope.tokens.totals()
+            if totals["calls"]:
+                logger.info(f"tool output tokens: {totals['tokens_before']} -> {totals['tokens_after']} over {totals['calls']} calls")
+
+    async def web_search_tool(self, questions: list) -> str:
+        return await self._compacted("web_search", await self.web_search_function(questions))
+
+    async def link_parser_tool(self, urls: list, query: Optional[str] = None) -> str:
+        return await self._compacted("link_parser", await self.link_parser_function(urls, query))
+
+    async def _compacted(self, tool: str, raw) -> str:
+        # 去重、去空字段并按预算截断后再写回消息历史
+        text, entry = compact(tool, raw, self.token_budgets[tool])
+        if entry is not None:
+            await report_progress("compacted", **entry)
+        return text
+
     async def web_search_function(self, questions: list) -> dict:
         if self.engine == "bing":
-            search = BingSearch(browser_pool=self.browser_pool)
+            search = BingSearch(browser_pool=self.browser_pool, **self.search_options)
         elif self.engine == "quark":
-            search = QuarkSearch(browser_pool=self.browser_pool)
+            search = QuarkSearch(browser_pool=self.browser_pool, **self.search_options)
         elif self.engine == "baidu":
-            search = BaiduSearch(browser_pool=self.browser_pool)
+            search = BaiduSearch(browser_pool=self.browser_pool, **self.search_options)
         elif self.engine == "sougou":
-            search = SougouSearch(browser_pool=self.browser_pool)
+            search = SougouSearch(browser_pool=self.browser_pool, **self.search_options)
+        elif self.engine == "meta":
+            search = MetaSearch(browser_pool=self.browser_pool, **self.search_options)
         else:
             raise "engine输入错误"
+        if self.serp_cache is not None:
+            search = CachedSearch(search, self.serp_cache)
         result = await search.response(questions)
+        store = current_store()
+        if store is not None:
+            store.start(top_urls(result, self.prefetch_top_n))
+        await report_progress("searched", queries=len(questions), results=sum(len(v) for v in result.values()))
         return result
 
+    def _recrawl(self, store: PrefetchStore, urls: List[str], reports: list) -> AsyncIterator[dict]:
+        for url in urls:
+            store.unclaim(url)
+        return self.crawl_scheduler.stream(urls, reports)
+
     async def link_parser_function(self, urls: list, query: Optional[str] = None) -> list:
+        # 边爬边处理：短时间窗口内爬完的页面合成一批切分重排，不必等待最慢的页面
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + clamp(self.crawl_deadline)
+        pages, rerank_tasks, reports = [], [], []
+        batch: List[dict] = []
+        flush_handle = None
+
+        def flush():
+            nonlocal flush_handle
+            flush_handle = None
+            if batch:
+                rerank_tasks.append(asyncio.create_task(split_and_reranker(query, list(batch))))
+                batch.clear()
+
+        store = current_store()
+        prefetched, remaining = store.claim(urls) if store is not None else ({}, urls)
+        stream = self.crawl_scheduler.stream(remaining, reports)
+        pages_iter = merge_pages(prefetched, stream, lambda urls: self._recrawl(store, urls, reports)) if prefetched else stream
         try:
-            async with self.crawler_pool.get_crawler() as crawler:
-                results = await crawler.run(urls)
-                if query:
-                    results = await split_and_reranker(query, results)
-                    print(results)
-                    return results
-                else:
-                    return results
-        except:
-            return results
+            async with asyncio.timeout_at(deadline):
+                async for page in pages_iter:
+                    pages.append(page)
+                    if query:
+                        batch.append(page)
+                        if flush_handle is None:
+                            flush_handle = loop.call_later(self.rerank_window, flush)
+        except TimeoutError:
+            logger.warning(f"link_parser deadline reached, {len(pages)}/{len(urls)} pages crawled")
+        except Exception as e:
+            logger.warning(f"link_parser crawl failed after {len(pages)} pages: {e!r}")
+        finally:
+            if flush_handle is not None:
+                flush_handle.cancel()
+            await pages_iter.aclose()
+            await stream.aclose()
+        slowest = sorted(reports, key=lambda r: r.crawl_ms, reverse=True)[:3]
+        if slowest:
+            logger.info("link_parser crawl: " + ", ".join(f"{r.domain} {r.status} {r.crawl_ms:.0f}ms" for r in slowest))
+        await report_progress("crawled", urls=len(urls), pages=len(pages), prefetched=len(prefetched))
+
+        if query:
+            flush()
+            results = []
+            if rerank_tasks:
+                timeout = clamp(max(0.0, deadline - loop.time()) + self.rerank_grace)
+                done, pending = await asyncio.wait(rerank_tasks, timeout=timeout)
+                for task in pending:
+                    task.cancel()
+                for task in rerank_tasks:
+                    if task in done and task.exception() is None:
+                        results.extend(task.result())
+                    elif task in done:
+                        logger.warning(f"link_parser rerank failed: {task.exception()!r}")
+            pages = results
+
+        order = {canonicalize_url(url): i for i, url in enumerate(urls)}
+        return sorted(pages, key=lambda page: order.get(canonicalize_url(page["url"]), len(urls)))
 
 async def split_and_reranker(query, contents):
+    # 先切分全部页面，再一次性批量向量化并打分，最后按页面取 top-k
+    with span("chunk"):
+        # 切分是纯 CPU 计算，放到执行器中，避免阻塞其他请求
+        groups = await get_executor().map(chunk_text, [content["content"] or "" for content in contents])
+    with span("rerank"):
+        reranked = await reranker.get_reranked_groups(query, groups, top_k=10)
     results = []
-    for content in contents:
-        splitter = Chunker()
-        final_splits = splitter.split_text(content["content"])
-        final_splits = [chunk for chunk in final_splits]
-        reranker_results = await reranker.get_reranked_documents(query, final_splits, top_k=10)
+    for content, reranker_results in zip(contents, reranked):
         content["content"] = "\n".join(reranker_results)
         if content["content"]:
             results.append(content)
+    await report_progress("reranked", pages=len(results), chunks=sum(len(r) for r in reranked))
     return results
\ No newline at end of file
@@ -1,28 +1,164 @@
 from pydantic import BaseModel
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from contextlib import asynccontextmanager
+import asyncio
+import json
+import math
+import os
+import time
 from agent import ToolsGraph
-from pools import BrowserPool, CrawlerPool
+from pools import BrowserPool, CrawlerPool, ResourcePolicy
+from caches import SerpCache, SQLiteStore, ContentCache
+from engines import search_options_from_env
+from engines.http_client import close_http_client
+from runtime import AdmissionController, Overloaded, DeadlineExceeded, deadline_scope, remaining, REGISTRY, enable_tracing
+from runtime import LoopLagMonitor, get_executor
 
-browser_pool = BrowserPool(pool_size=1)
-crawler_pool = CrawlerPool(pool_size=1)
-graph = ToolsGraph(browser_pool, crawler_pool, engine="sougou")
+# 每个 worker 进程独立的浏览器池；缓存通过 SQLite 文件在 worker 之间共享
+WORKERS = int(os.getenv("WORKERS", "1"))
+# 每个请求的端到端时限（秒），传递到引擎等待、爬虫超时和 LLM 调用
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "60"))
+# /stats 和 /metrics 只输出最慢的 N 个域名，控制 domain 标签的基数
+TOP_DOMAINS = int(os.getenv("STATS_TOP_DOMAINS", "20"))
+
+
+def pool_size(name: str) -> int:
+    default = max(1, min(4, (os.cpu_count() or 1) // WORKERS))
+    return int(os.getenv(name, default))
+
+
+def pool_scaling(prefix: str, max_uses: int, max_rss_mb: int) -> dict:
+    # 池在 <PREFIX>_POOL_MIN 和 <PREFIX>_POOL_SIZE 之间伸缩；按使用次数或内存（MB，0 为不限）回收实例
+    return {
+        "min_size": int(os.getenv(f"{prefix}_POOL_MIN", "1")),
+        "idle_timeout": float(os.getenv("POOL_IDLE_TIMEOUT", "300")),
+        "max_uses": int(os.getenv(f"{prefix}_MAX_USES", max_uses)),
+        "max_rss_mb": float(os.getenv(f"{prefix}_MAX_RSS_MB", max_rss_mb)),
+        "scale_up_after": float(os.getenv("POOL_SCALE_UP_AFTER", "0.1")),
+        "rss_interval": float(os.getenv("POOL_RSS_INTERVAL", "10")),
+    }
+
+
+def cache_stats(tools) -> dict:
+    # 会查询 SQLite（条目数、占用字节），只在线程中调用
+    stats = {"serp": tools.serp_cache.stats()}
+    if tools.crawl_scheduler.content_cache is not None:
+        stats["content"] = tools.crawl_scheduler.content_cache.stats()
+    if tools.embedding_cache is not None:
+        stats["embedding"] = tools.embedding_cache.stats()
+    return stats
+
+
+def register_gauges(app: FastAPI):
+    graph = app.state.graph
+    tools = graph.ts_manage
+
+    def pools():
+        rows = []
+        for name, pool in (("browser", graph.browser_pool), ("crawler", graph.crawler_pool)):
+            for state, value in pool.utilization().items():
+                rows.append(({"pool": name, "state": state}, value))
+        return rows
+
+    def caches(field: str):
+        return [({"cache": name}, stats[field]) for name, stats in cache_stats(tools).items() if field in stats]
+
+    def domains():
+        rows = []
+        for domain, summary in tools.crawl_scheduler.stats(top=TOP_DOMAINS).items():
+            rows.append(({"domain": domain, "quantile": "0.5"}, summary["p50_ms"] / 1000))
+            rows.append(({"domain": domain, "quantile": "0.95"}, summary["p95_ms"] / 1000))
+        return rows
+
+    REGISTRY.gauge("pool_instances", "Browser and crawler pool size and utilization by state.", pools)
+    REGISTRY.gauge(
+        "browser_pages", "Warm page reuse across pooled browsers.",
+        lambda: [({"kind": k}, v) for k, v in graph.browser_pool.page_stats().items()],
+    )
+    REGISTRY.gauge(
+        "admission_requests", "Requests in flight, waiting, admitted and rejected.",
+        lambda: [({"state": k}, v) for k, v in app.state.admission.stats().items() if not k.startswith("queue_wait")],
+    )
+    REGISTRY.gauge("cache_hit_ratio", "Hit ratio of the SERP, page content and embedding caches.", lambda: caches("hit_rate"))
+    REGISTRY.gauge(
+        "cache_bytes", "Bytes held by the SERP and page content caches, by tier.",
+        lambda: [
+            ({"cache": name, "tier": tier}, stats[f"{tier}_bytes"])
+            for name, stats in cache_stats(tools).items() for tier in ("memory", "disk") if f"{tier}_bytes" in stats
+        ],
+    )
+    REGISTRY.gauge(
+        "prefetch_urls", "Speculatively prefetched URLs by outcome.",
+        lambda: [({"outcome": k}, v) for k, v in tools.prefetch_totals.items()],
+    )
+    REGISTRY.gauge("crawl_domain_latency_seconds", f"Crawl latency quantiles of the {TOP_DOMAINS} slowest domains.", domains)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # startup：可选预热
-    await browser_pool._create_browser_instance(headless=True)
-    await crawler_pool._get_instance()
-    print("✅ Browser pool initialized.")
+    # startup：在 worker 自己的事件循环里创建池，避免跨进程共享浏览器
+    # 默认拦截图片、字体、音视频和统计广告请求；爬虫额外拦截样式表（CRAWL_ 前缀的变量单独配置）
+    browser_pool = BrowserPool(
+        pool_size=pool_size("BROWSER_POOL_SIZE"),
+        resource_policy=ResourcePolicy.from_env(),
+        **pool_scaling("BROWSER", max_uses=200, max_rss_mb=1536),
+    )
+    crawler_pool = CrawlerPool(
+        pool_size=pool_size("CRAWLER_POOL_SIZE"),
+        resource_policy=ResourcePolicy.from_env("CRAWL_", block_types={"image", "media", "font", "stylesheet"}),
+        **pool_scaling("CRAWLER", max_uses=100, max_rss_mb=1536),
+    )
+    serp_cache = SerpCache(store=SQLiteStore(os.getenv("SERP_CACHE_PATH", ".cache/serp.sqlite"), table="serp"))
+    content_cache = ContentCache(
+        SQLiteStore(os.getenv("CONTENT_CACHE_PATH", ".cache/content.sqlite"), table="content"),
+        ttl=float(os.getenv("CONTENT_CACHE_TTL", 24 * 3600)),
+    )
+    # PREFETCH_TOP_N>0 时在 LLM 思考期间预取搜索结果的前 N 个链接
+    # SEARCH_FETCH_MODE=direct 或 bing:direct,baidu:browser；SEARCH_ENGINE=meta 时另见 META_* 变量
+    engine = os.getenv("SEARCH_ENGINE", "sougou")
+    app.state.graph = ToolsGraph(
+        browser_pool,
+        crawler_pool,
+        engine=engine,
+        search_options=search_options_from_env(engine),
+        serp_cache=serp_cache,
+        prefetch_top_n=int(os.getenv("PREFETCH_TOP_N", "0")),
+        content_cache=content_cache,
+    )
+    # 超出并发上限的请求最多排队 MAX_QUEUE 个，队列满返回 429，排队超时返回 503
+    app.state.admission = AdmissionController(
+        max_concurrency=int(os.getenv("MAX_CONCURRENCY", browser_pool.pool_size * 2)),
+        max_queue=int(os.getenv("MAX_QUEUE", "16")),
+        queue_timeout=float(os.getenv("QUEUE_TIMEOUT", "10")),
+    )
+    register_gauges(app)
+    # OTEL_TRACING=1 时为每个阶段创建 OpenTelemetry span（需安装 opentelemetry）
+    if os.getenv("OTEL_TRACING") == "1" and not enable_tracing():
+        print("⚠️ OTEL_TRACING=1 but opentelemetry is not installed.")
+    # 解析和切分在 CPU_EXECUTOR（thread/process/inline）中执行；事件循环阻塞时间见 /stats
+    executor = get_executor()
+    app.state.loop_lag = LoopLagMonitor()
+    app.state.loop_lag.start()
+    try:
+        await executor.warmup()
+        # 预热：各创建 min_size 个实例，并开始回收空闲实例
+        await asyncio.gather(browser_pool.start(), crawler_pool.start())
+        print(f"✅ Browser pool initialized (pid {os.getpid()}).")
 
-    yield  # 应用运行中，等待请求
-
-    # shutdown：清理资源
-    await browser_pool.cleanup()
-    await crawler_pool.cleanup()
-    print("✅ Browser pool cleaned up.")
+        yield  # 应用运行中，等待请求
+    finally:
+        # shutdown：清理资源
+        await browser_pool.cleanup()
+        await crawler_pool.cleanup()
+        await close_http_client()
+        await app.state.loop_lag.stop()
+        executor.shutdown()
+        serp_cache.store.close()
+        content_cache.store.close()
+        print("✅ Browser pool cleaned up.")
 
 app = FastAPI(lifespan=lifespan)
 
@@ -34,16 +170,113 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        {"error": exc.reason},
+        status_code=exc.status,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse({"error": str(exc)}, status_code=504)
+
+
 class QueryRequest(BaseModel):
     question: str
 
 
 @app.post("/search")
-async def search(query: QueryRequest):
-    result = await graph.run(query.question)
+async def search(query: QueryRequest, request: Request, response: Response):
+    with deadline_scope(REQUEST_DEADLINE):
+        async with request.app.state.admission.admit() as ticket:
+            response.headers["X-Queue-Wait-Ms"] = f"{ticket.queue_wait * 1000:.0f}"
+            try:
+                # 到达截止时间后取消剩余工作，而不是让它在后台继续运行
+                async with asyncio.timeout(remaining()):
+                    result = await request.app.state.graph.run(query.question)
+            except TimeoutError:
+                raise DeadlineExceeded("request deadline exceeded")
     return {"data": result}
 
+
+async def sse_response(question: str, request: Request) -> StreamingResponse:
+    deadline = time.monotonic() + REQUEST_DEADLINE
+    with deadline_scope(at=deadline):
+        # 在返回响应前完成准入，过载时客户端拿到的是 429/503 而不是空的事件流
+        ticket = await request.app.state.admission.acquire()
+
+    async def events():
+        with deadline_scope(at=deadline):
+            stream = request.app.state.graph.stream(question)
+            try:
+                async for event in stream:
+                    # 客户端断开后停止，关闭 stream 会取消剩余的浏览器和 LLM 调用
+                    if await request.is_disconnected():
+                        break
+                    yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False, default=str)}\n\n"
+                    if remaining() <= 0:
+                        raise DeadlineExceeded("request deadline exceeded")
+            except (DeadlineExceeded, TimeoutError) as e:
+                yield f"event: error\ndata: {json.dumps({'error': str(e) or 'request deadline exceeded'})}\n\n"
+            finally:
+                await stream.aclose()
+                ticket.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Queue-Wait-Ms": f"{ticket.queue_wait * 1000:.0f}",
+        },
+        # 响应未开始流式输出就结束时也要释放名额
+        background=BackgroundTask(ticket.release),
+    )
+
+
+@app.post("/search/stream")
+async def search_stream(query: QueryRequest, request: Request):
+    return await sse_response(query.question, request)
+
+
+@app.get("/search/stream")
+async def search_stream_get(question: str, request: Request):
+    # EventSource 只支持 GET
+    return await sse_response(question, request)
+
+
+@app.get("/metrics")
+async def metrics():
+    # 部分 gauge 回调会查询 SQLite，在线程中渲染，不阻塞事件循环
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+async def stats(request: Request):
+    # 准入队列（含排队时间分位数）、池大小与回收次数、浏览器页面复用情况、事件循环阻塞时间、资源拦截情况、最慢的域名与缓存命中率和占用
+    graph = request.app.state.graph
+    return {
+        "admission": request.app.state.admission.stats(),
+        "pools": {
+            name: {**pool.utilization(), "recycled": pool.recycle_stats()}
+            for name, pool in (("browser", graph.browser_pool), ("crawler", graph.crawler_pool))
+        },
+        "pages": request.app.state.graph.browser_pool.page_stats(),
+        "loop_lag": request.app.state.loop_lag.stats(),
+        "resources": {
+            "browser": request.app.state.graph.browser_pool.resource_stats(),
+            "crawler": request.app.state.graph.crawler_pool.resource_stats(),
+        },
+        "domains": graph.ts_manage.crawl_scheduler.stats(top=TOP_DOMAINS),
+        "caches": await asyncio.to_thread(cache_stats, graph.ts_manage),
+    }
+
 if __name__ == "__main__":
     import uvicorn
-    port = 8000
-    uvicorn.run(app, host="0.0.0.0", port=port, workers=1)
+    port = int(os.getenv("PORT", "8000"))
+    # 多 worker 时 uvicorn 需要以导入字符串的形式加载应用
+    uvicorn.run("api_serve:app", host="0.0.0.0", port=port, workers=WORKERS)
@@ -0,0 +1,81 @@
+"""
+Compare SpanChunker against the langchain-based Chunker and MarkdownSplitter on large pages.
+
+python -m bench.chunking --page-kb 50 200 1000 --repeat 3
+
+Pages are built from the bilingual article fixture, either as markdown with headings and
+blank lines or "dense", one article per line as crawlers often emit. For each chunker the table
+shows the best time per page, the peak Python-heap allocation, the number of chunks and
+the largest chunk in estimated tokens, which is what the embedding model's limit sees.
+"""
+import argparse
+import time
+import tracemalloc
+
+from lxml import html as lxml_html
+
+from reranker import Chunker, MarkdownSplitter, SpanChunker
+from .fixture_server import FIXTURE_DIR
+
+
+def article_markdown(seed: int, dense: bool = False) -> str:
+    root = lxml_html.document_fromstring((FIXTURE_DIR / "article.html").read_text(encoding="utf-8").replace("{article}", str(seed)))
+    lines = []
+    for element in root.iter("h1", "h2", "p"):
+        text = element.text_content().strip()
+        lines.append(f"{'#' * int(element.tag[1])} {text}" if element.tag != "p" else text)
+    if dense:
+        return " ".join(lines) + "\n"
+    return "\n\n".join(lines) + "\n\n"
+
+
+def make_page(kb: int, dense: bool = False) -> str:
+    parts, size, seed = [], 0, 0
+    while size < kb * 1024:
+        part = article_markdown(seed, dense)
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+        seed += 1
+    return "".join(parts)
+
+
+def measure(split, text: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(text)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    split(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, best, peak
+
+
+def main(args):
+    tokens = SpanChunker(unit="tokens")
+    shared = SpanChunker(chunk_size=256, chunk_overlap=64, unit="tokens")
+    chunkers = [
+        # 旧的 split_and_reranker 每个页面新建一个 Chunker
+        ("Chunker (new per page)", lambda text: Chunker().split_text(text)),
+        ("MarkdownSplitter", lambda text: [doc.page_content for doc in MarkdownSplitter(text, 512, 128).split()]),
+        ("SpanChunker chars", SpanChunker(chunk_size=512, chunk_overlap=128).split_text),
+        ("SpanChunker tokens", shared.split_text),
+        ("SpanChunker spans only", shared.spans),
+    ]
+    print(f"{'page':>13} {'chunker':<24} {'ms':>9} {'KiB':>8} {'chunks':>7} {'max tok':>8}")
+    pages = [(layout, kb, make_page(kb, dense=layout == "dense")) for layout in args.layouts for kb in args.page_kb]
+    for layout, kb, text in pages:
+        for label, split in chunkers:
+            chunks, seconds, peak = measure(split, text, args.repeat)
+            strings = [text[s:e] for s, e in chunks] if chunks and isinstance(chunks[0], tuple) else chunks
+            largest = max((tokens.cost(chunk, 0, len(chunk)) for chunk in strings), default=0)
+            print(f"{layout:>8}{kb:>5}KB {label:<24} {seconds * 1000:>9.1f} {peak / 1024:>8.0f} {len(chunks):>7} {largest:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-kb", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--layouts", nargs="+", default=["markdown", "dense"], choices=["markdown", "dense"])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,222 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+import uuid
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+class FakeOpenAIServer:
+    """A local OpenAI-compatible server with configurable latency.
+
+    `/v1/embeddings` returns deterministic unit vectors derived from a hash of each input,
+    and rejects requests with more than `max_batch_size` inputs like a real provider.
+    `/v1/chat/completions` plays a scripted agent: a fresh question gets a `web_search` call,
+    a `web_search` result gets a `link_parser` call on its first URLs, anything else gets a
+    final answer. Streaming responses wait `token_latency` seconds between chunks.
+    Request counts are kept in `requests` so benchmarks can report round trips.
+
+    Usage:
+        with FakeOpenAIServer(latency=0.2) as server:
+            reranker = OpenAIEmbeddingReranker(base_url=server.url, api_key="x", model="fake")
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        dim: int = 256,
+        max_batch_size: int = 256,
+        token_latency: float = 0.0,
+        parse_urls: int = 3,
+    ):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.parse_urls = parse_urls
+        self.dim = dim
+        self.max_batch_size = max_batch_size
+        self.requests = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+
+    def embed(self, text: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        length = int(request.headers.get("Content-Length", 0))
+        body = json.loads(request.rfile.read(length) or b"{}")
+        path = request.path.rstrip("/")
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if path.endswith("/embeddings"):
+            status, payload = self.embeddings(body)
+        elif path.endswith("/chat/completions"):
+            message = self.next_message(body.get("messages", []))
+            if body.get("stream"):
+                self.send_stream(request, body, message)
+                return
+            status, payload = 200, self.completion(body, message)
+        else:
+            status, payload = 404, {"error": {"message": f"unknown path {path}"}}
+        self.send_json(request, status, payload)
+
+    def embeddings(self, body: dict):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if len(inputs) > self.max_batch_size:
+            return 400, {"error": {"message": f"batch size {len(inputs)} exceeds {self.max_batch_size}"}}
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self.embed(text)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(len(text) for text in inputs)
+        return 200, {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def next_message(self, messages: list) -> dict:
+        """The assistant turn the scripted agent takes after `messages`."""
+        question = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+        last = messages[-1] if messages else {}
+        if last.get("role") == "user":
+            return self.tool_call("web_search", {"questions": [question, f"{question} 详细介绍"]})
+        if last.get("role") == "tool" and self.tool_name(messages, last.get("tool_call_id")) == "web_search":
+            urls = list(dict.fromkeys(re.findall(r"https?://[^\s\"'<>)\]]+", last.get("content") or "")))
+            if urls:
+                return self.tool_call("link_parser", {"urls": urls[:self.parse_urls], "query": question})
+        sources = re.findall(r"https?://[^\s\"'<>)\]]+", last.get("content") or "")[:3]
+        answer = f"关于“{question}”，根据检索到的资料整理如下。" + "".join(f"[{i + 1}]({url}) " for i, url in enumerate(sources))
+        return {"role": "assistant", "content": answer.strip()}
+
+    @staticmethod
+    def tool_name(messages: list, call_id: str) -> str:
+        for message in messages:
+            for call in message.get("tool_calls") or []:
+                if call.get("id") == call_id:
+                    return call["function"]["name"]
+        return ""
+
+    @staticmethod
+    def tool_call(name: str, arguments: dict) -> dict:
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)},
+            }],
+        }
+
+    @staticmethod
+    def usage(body: dict, message: dict) -> dict:
+        prompt = sum(len(json.dumps(m, ensure_ascii=False)) for m in body.get("messages", [])) // 4
+        completion = len(json.dumps(message, ensure_ascii=False)) // 4
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def completion(self, body: dict, message: dict) -> dict:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": self.usage(body, message),
+        }
+
+    def send_stream(self, request: BaseHTTPRequestHandler, body: dict, message: dict):
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+        }
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> bytes:
+            payload = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        request.close_connection = True
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.send_header("Connection", "close")
+        request.end_headers()
+        request.wfile.write(chunk({"role": "assistant", "content": ""}))
+        if message.get("tool_calls"):
+            for index, call in enumerate(message["tool_calls"]):
+                request.wfile.write(chunk({"tool_calls": [{"index": index, **call}]}))
+            finish_reason = "tool_calls"
+        else:
+            # 每两个字符一个 chunk，模拟逐 token 输出
+            content = message["content"]
+            for i in range(0, len(content), 2):
+                if self.token_latency:
+                    time.sleep(self.token_latency)
+                request.wfile.write(chunk({"content": content[i:i + 2]}))
+                request.wfile.flush()
+            finish_reason = "stop"
+        request.wfile.write(chunk({}, finish_reason))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            request.wfile.write(f"data: {json.dumps({**base, 'choices': [], 'usage': self.usage(body, message)})}\n\n".encode("utf-8"))
+        request.wfile.write(b"data: [DONE]\n\n")
+        request.wfile.flush()
+
+    @staticmethod
+    def send_json(request: BaseHTTPRequestHandler, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,60 @@
+"""
+Compare sequential, concurrent and direct-HTTP sub-query fan-out against the local fixture server.
+
+python -m bench.fanout --queries 5 --latency 1.0 --concurrency 5
+"""
+import argparse
+import asyncio
+import time
+
+from engines import BingSearch
+from engines.http_client import close_http_client
+from pools import BrowserPool
+from .fixture_server import FixtureServer
+
+
+async def timed_response(search: BingSearch, questions, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = await search.response(questions)
+        best = min(best, time.perf_counter() - start)
+        assert list(results) == questions, "results must come back in question order"
+    return best
+
+
+async def main(args):
+    questions = [f"fixture query {i}" for i in range(args.queries)]
+    browser_pool = BrowserPool(pool_size=args.pool_size, warm_pages=args.concurrency)
+    try:
+        with FixtureServer(latency=args.latency) as server:
+            modes = [
+                ("sequential", dict(concurrency=1)),
+                ("parallel", dict(concurrency=args.concurrency)),
+                ("parallel-spread", dict(concurrency=args.concurrency, spread=True)),
+                ("direct-http", dict(concurrency=args.concurrency, fetch_mode="direct")),
+            ]
+            timings = {}
+            for label, kwargs in modes:
+                search = BingSearch(browser_pool=browser_pool, **kwargs)
+                search.base_url = server.url
+                timings[label] = await timed_response(search, questions, args.repeat)
+
+        baseline = timings["sequential"]
+        print(f"{args.queries} sub-queries, {args.latency:.2f}s server latency, best of {args.repeat}")
+        for label, seconds in timings.items():
+            print(f"{label:<16} {seconds:7.2f}s  x{baseline / seconds:.2f}")
+        print("page pool:", browser_pool.page_stats())
+    finally:
+        await close_http_client()
+        await browser_pool.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
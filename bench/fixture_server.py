@@ -0,0 +1,139 @@
+import html
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+
+class FixtureServer:
+    """A local HTTP server that serves recorded engine pages with a configurable delay.
+
+    Every engine has a home page and a result page under its own prefix (`/bing`, `/baidu/`,
+    `/sougou`, `/quark/`; Bing is also served at the root), and `/articles/<n>` serves
+    sample article pages that the result pages link to. Routes map a path to (fixture
+    file, query parameter): the parameter value is substituted for `{query}` so every
+    sub-query gets a distinct page, and `{base}` becomes the server URL. Pages also pull a
+    stylesheet and an image from `/static/`; `static_requests` and `static_bytes` count what
+    was actually downloaded, to measure resource blocking.
+
+    Usage:
+        with FixtureServer(latency=0.5) as server:
+            search.base_url = server.url
+            os.environ.update(server.base_url_env())
+    """
+
+    routes = {
+        "/": ("bing_home.html", None),
+        "/search": ("bing_serp.html", "q"),
+        "/bing": ("bing_home.html", None),
+        "/bing/search": ("bing_serp.html", "q"),
+        "/baidu/": ("baidu_home.html", None),
+        "/baidu/s": ("baidu_serp.html", "wd"),
+        "/sougou": ("sougou_home.html", None),
+        "/sougou/web": ("sougou_serp.html", "query"),
+        "/quark/": ("quark_home.html", None),
+        "/quark/search": ("quark_serp.html", "q"),
+    }
+
+    # /static/ 下各类资源的大小（字节）与类型
+    static_assets = {
+        ".css": (20_000, "text/css"),
+        ".jpg": (60_000, "image/jpeg"),
+        ".woff2": (40_000, "font/woff2"),
+    }
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, article_latency: float = 0.0):
+        self.latency = latency
+        self.article_latency = article_latency
+        self.static_requests = 0
+        self.static_bytes = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_url_env(self) -> dict:
+        """Environment overrides that point every engine at this server."""
+        return {
+            "BING_BASE_URL": f"{self.url}/bing",
+            "BAIDU_BASE_URL": f"{self.url}/baidu/",
+            "SOUGOU_BASE_URL": f"{self.url}/sougou",
+            "QUARK_BASE_URL": f"{self.url}/quark/",
+        }
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        parsed = urlparse(request.path)
+        if parsed.path.startswith("/static/"):
+            self.send_static(request, parsed.path)
+            return
+        if parsed.path.startswith("/articles/"):
+            self.send_html(request, self.article(parsed.path.rsplit("/", 1)[-1]))
+            return
+        route = self.routes.get(parsed.path)
+        if route is None:
+            request.send_error(404)
+            return
+        fixture, param = route
+        body = (FIXTURE_DIR / fixture).read_text(encoding="utf-8").replace("{base}", self.url)
+        if param:
+            query = parse_qs(parsed.query).get(param, [""])[0]
+            body = body.replace("{query}", html.escape(query))
+            # 只对结果页模拟服务端耗时
+            if self.latency:
+                time.sleep(self.latency)
+        self.send_html(request, body)
+
+    def article(self, name: str) -> str:
+        if self.article_latency:
+            time.sleep(self.article_latency)
+        body = (FIXTURE_DIR / "article.html").read_text(encoding="utf-8").replace("{base}", self.url)
+        return body.replace("{article}", html.escape(name))
+
+    def send_static(self, request: BaseHTTPRequestHandler, path: str):
+        asset = self.static_assets.get(Path(path).suffix)
+        if asset is None:
+            request.send_error(404)
+            return
+        size, content_type = asset
+        with self._lock:
+            self.static_requests += 1
+            self.static_bytes += size
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(size))
+        request.end_headers()
+        request.wfile.write(b"\0" * size)
+
+    @staticmethod
+    def send_html(request: BaseHTTPRequestHandler, body: str):
+        data = body.encode("utf-8")
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
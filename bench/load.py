@@ -0,0 +1,247 @@
+"""
+Offline end-to-end load test: the real API server against local SERP fixtures and a fake OpenAI server.
+
+python -m bench.load --engine bing --concurrency 1 4 8 --requests 40 --output load.json
+
+Starts the fixture server and the fake chat/embeddings server in this process, launches
+`api_serve.py` in a subprocess pointed at both, then fires `--requests` POST /search calls
+at each concurrency level. Reports p50/p95/p99 latency, requests per second, response
+statuses, the peak RSS of the Chromium processes the server spawned and the static bytes
+(stylesheets, images) the fixture pages pulled, which resource blocking should cut. Run
+once with RESOURCE_BLOCKING=0 to compare. No network needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+import psutil
+
+from .fake_openai import FakeOpenAIServer
+from .fixture_server import FixtureServer
+
+REPO = Path(__file__).resolve().parent.parent
+CHROMIUM_NAMES = ("chrom", "headless_shell")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class RSSSampler:
+    """Samples the summed RSS of the server process tree in a background thread."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak_chromium = 0
+        self.peak_server = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self):
+        chromium = server = 0
+        try:
+            processes = [self.process] + self.process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return 0, 0
+        for process in processes:
+            try:
+                rss = process.memory_info().rss
+                name = process.name().lower()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            if any(marker in name for marker in CHROMIUM_NAMES):
+                chromium += rss
+            elif name.startswith("python"):
+                server += rss
+        return chromium, server
+
+    def _run(self):
+        while not self._stop.is_set():
+            chromium, server = self.sample()
+            self.peak_chromium = max(self.peak_chromium, chromium)
+            self.peak_server = max(self.peak_server, server)
+            self._stop.wait(self.interval)
+
+    def reset(self):
+        self.peak_chromium = self.peak_server = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def server_env(args, fixtures: FixtureServer, openai: FakeOpenAIServer, cache_dir: str, port: int) -> dict:
+    env = dict(os.environ)
+    env.update(fixtures.base_url_env())
+    env.update({
+        "OPENAI_BASE_URL": openai.url,
+        "OPENAI_API_KEY": "bench",
+        "MODEL_NAME": "fake",
+        "EMBEDDING_BASE_URL": openai.url,
+        "EMBEDDING_API_KEY": "bench",
+        "EMBEDDING_MODEL_NAME": "fake",
+        # 每次运行使用全新的缓存，否则第二轮会全部命中缓存
+        "SERP_CACHE_PATH": os.path.join(cache_dir, "serp.sqlite"),
+        "CONTENT_CACHE_PATH": os.path.join(cache_dir, "content.sqlite"),
+        "EMBEDDING_CACHE_DIR": os.path.join(cache_dir, "embeddings"),
+        "SEARCH_ENGINE": args.engine,
+        "WORKERS": str(args.workers),
+        "PORT": str(port),
+        "REQUEST_DEADLINE": str(args.deadline),
+    })
+    return env
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"api_serve.py exited with code {process.returncode}")
+        try:
+            if (await client.get("/stats")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"api_serve.py not ready after {timeout:.0f}s")
+
+
+def make_questions(args, level: int, fixtures: FixtureServer) -> List[str]:
+    questions = []
+    url_every = round(1 / args.url_ratio) if args.url_ratio > 0 else 0
+    for i in range(args.requests):
+        if url_every and i % url_every == 0:
+            # 直接给出链接的问题走 router 快速路径，跳过搜索
+            questions.append(f"总结一下 {fixtures.url}/articles/{i % 6 + 1}")
+        else:
+            # 每个问题都不同，避免 SERP 缓存掩盖真实耗时
+            questions.append(f"c{level} 问题 {i} 的最新进展")
+    return questions
+
+
+async def run_level(client: httpx.AsyncClient, questions: List[str], concurrency: int) -> dict:
+    latencies, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/search", json={"question": question})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": len(questions),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(questions) / elapsed, 2),
+        "p50": round(percentile(latencies, 0.50), 3),
+        "p95": round(percentile(latencies, 0.95), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "statuses": statuses,
+    }
+
+
+def stop_server(process: subprocess.Popen):
+    if process.poll() is None:
+        # SIGINT 让 uvicorn 走 lifespan 的清理逻辑，关闭浏览器
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+async def main(args) -> Optional[List[dict]]:
+    port = args.port or free_port()
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="bench-load-") as cache_dir, \
+            FixtureServer(latency=args.serp_latency, article_latency=args.article_latency) as fixtures, \
+            FakeOpenAIServer(latency=args.llm_latency, token_latency=args.token_latency) as openai:
+        process = subprocess.Popen(
+            [sys.executable, "api_serve.py"],
+            cwd=REPO,
+            env=server_env(args, fixtures, openai, cache_dir, port),
+            stdout=None if args.verbose else subprocess.DEVNULL,
+            stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        try:
+            timeout = httpx.Timeout(args.deadline + 30)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+                await wait_ready(client, process, args.startup_timeout)
+                with RSSSampler(process.pid) as sampler:
+                    for level in args.concurrency:
+                        sampler.reset()
+                        static_bytes = fixtures.static_bytes
+                        row = await run_level(client, make_questions(args, level, fixtures), level)
+                        row["chromium_rss_mb"] = round(sampler.peak_chromium / 2 ** 20, 1)
+                        row["server_rss_mb"] = round(sampler.peak_server / 2 ** 20, 1)
+                        row["static_kb"] = round((fixtures.static_bytes - static_bytes) / 1024)
+                        rows.append(row)
+                        print(
+                            f"c={level:<3} {row['rps']:7.2f} req/s  p50 {row['p50']:6.2f}s  p95 {row['p95']:6.2f}s  "
+                            f"p99 {row['p99']:6.2f}s  chromium {row['chromium_rss_mb']:7.1f}MB  static {row['static_kb']}KB  {row['statuses']}"
+                        )
+                stats = (await client.get("/stats")).json()
+        finally:
+            stop_server(process)
+        print("llm round trips:", openai.requests)
+        print("server stats:", json.dumps(stats, ensure_ascii=False))
+
+    if args.output:
+        report = {"args": vars(args), "levels": rows, "server_stats": stats}
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", default="bing", choices=["bing", "baidu", "sougou", "quark", "meta"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=20, help="requests per concurrency level")
+    parser.add_argument("--url-ratio", type=float, default=0.0, help="share of questions that are bare article URLs")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--deadline", type=float, default=60.0)
+    parser.add_argument("--serp-latency", type=float, default=0.0)
+    parser.add_argument("--article-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write a JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    asyncio.run(main(parser.parse_args()))
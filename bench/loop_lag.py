@@ -0,0 +1,68 @@
+"""
+Event-loop lag while parsing SERPs and chunking pages, per executor mode.
+
+python -m bench.loop_lag --requests 8 --page-kb 200 --results 50
+
+Each simulated request parses a padded Baidu fixture and chunks a few large markdown
+pages, all concurrently. A `LoopLagMonitor` runs alongside and reports how long the loop
+was blocked: with "inline" every other coroutine waits for each parse and chunk.
+"""
+import argparse
+import asyncio
+import time
+
+from engines import BaiduSearch
+from reranker import chunk_text
+from runtime.executor import CPUExecutor, LoopLagMonitor, set_executor
+from .fixture_server import FIXTURE_DIR
+from .parse import BASE, padded_fixture
+
+
+def make_page(kb: int, seed: int) -> str:
+    paragraph = (FIXTURE_DIR / "article.html").read_text(encoding="utf-8")
+    text = f"# 第 {seed} 篇\n\n" + paragraph.replace("{article}", str(seed))
+    return (text * (kb * 1024 // len(text) + 1))[:kb * 1024]
+
+
+async def one_request(engine: BaiduSearch, html: str, pages, executor: CPUExecutor):
+    await engine.parse(html)
+    await executor.map(chunk_text, pages)
+
+
+async def run_mode(mode: str, args, html: str, pages) -> dict:
+    executor = CPUExecutor(mode=mode, max_workers=args.workers, inline_below=0)
+    set_executor(executor)
+    engine = BaiduSearch(browser_pool=None)
+    engine.base_url = BASE
+    try:
+        await executor.warmup()
+        async with LoopLagMonitor(interval=0.01) as monitor:
+            start = time.perf_counter()
+            await asyncio.gather(*(one_request(engine, html, pages, executor) for _ in range(args.requests)))
+            elapsed = time.perf_counter() - start
+            # 让监视器记录下最后一次阻塞
+            await asyncio.sleep(monitor.interval * 2)
+    finally:
+        set_executor(None)
+    return {"mode": mode, "seconds": elapsed, **monitor.stats()}
+
+
+async def main(args):
+    html = padded_fixture(BaiduSearch, "baidu_serp.html", args.results)
+    pages = [make_page(args.page_kb, i) for i in range(args.pages)]
+    print(f"{args.requests} requests x ({args.results}-result SERP + {args.pages} x {args.page_kb}KB pages)")
+    print(f"{'mode':<8} {'wall s':>7} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for mode in args.modes:
+        row = await run_mode(mode, args, html, pages)
+        print(f"{row['mode']:<8} {row['seconds']:>7.2f} {row['p50_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms {row['max_ms']:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--results", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--page-kb", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,174 @@
+"""
+Compare the compiled selector-spec parsers against the previous BeautifulSoup parsers
+on the stored SERP fixtures.
+
+python -m bench.parse --results 10 50 --repeat 20
+
+Each fixture is padded to `--results` results by cloning its result containers with
+distinct URLs. Reports the best time per page and the peak Python-heap allocation per page
+(tracemalloc, so libxml2's own buffers are not counted), and checks that both parsers
+return the same URLs.
+"""
+import argparse
+import copy
+import json
+import time
+import tracemalloc
+import unicodedata
+
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+from engines import BaiduSearch, BingSearch, QuarkSearch, SougouSearch
+from .fixture_server import FIXTURE_DIR
+
+BASE = "http://fixtures.local"
+
+
+# 以下是改为选择器描述之前各引擎的 parsing 实现，作为对照基线
+def legacy_bing(html, base_url):
+    soup = BeautifulSoup(html, "lxml")
+    items = soup.find_all("li", class_=lambda x: x and "b_algo" in x)
+    results = []
+    for item in items:
+        publisher_tag = item.find("a", class_="tilk")
+        publisher = publisher_tag.get("aria-label")
+        url = publisher_tag.get("href")
+        if item.find("p"):
+            content = unicodedata.normalize("NFKC", item.find("p").get_text(strip=True))
+            content_list = content.split(" · ")
+            if len(content_list) == 2:
+                time_, summary = content_list
+            else:
+                time_, summary = "UNKNOW", content_list[0]
+        else:
+            time_, summary = "", ""
+        title = item.find("h2").get_text(strip=True)
+        results.append({"title": title, "publisher": publisher, "url": url, "summary": summary, "time": time_})
+    return results
+
+
+def legacy_baidu(html, base_url):
+    soup = BeautifulSoup(html, "lxml")
+    items = soup.find_all("div", class_="c-container")
+    results = []
+    for item in items:
+        title_tag = item.find('h3', class_='c-title t t tts-title')
+        title = title_tag.get_text(strip=True) if title_tag else ''
+        publisher_tag = item.find('a', class_='siteLink_9TPP3')
+        publisher = publisher_tag.get_text(strip=True) if publisher_tag else ''
+        url_tag = item.find('a', class_='siteLink_9TPP3')
+        url = url_tag['href'] if url_tag else ''
+        summary_tag = item.find('span', class_='content-right_2s-H4')
+        summary = summary_tag.get_text(strip=True) if summary_tag else ''
+        time_tag = item.find("span", class_="c-color-gray2")
+        time_ = time_tag.get_text(strip=True) if time_tag else ''
+        data = {"title": title, "publisher": publisher, "url": url, "summary": summary, "time": time_}
+        if url:
+            results.append(data)
+        results = [json.loads(x) for x in set(json.dumps(d, sort_keys=True) for d in results)]
+    return results
+
+
+def legacy_sougou(html, base_url):
+    soup = BeautifulSoup(html, "lxml")
+    items = soup.find_all("div", class_="vrwrap")
+    results = []
+    for item in items:
+        title_tag = item.select_one("h3.vr-title a")
+        title = title_tag.get_text(strip=True) if title_tag else ""
+        url = title_tag.get("href", "") if title_tag else ""
+        if url.startswith("/link?url="):
+            url = f"{base_url}{url}"
+        summary_tag = item.select_one("div.text-layout p.star-wiki")
+        if summary_tag:
+            summary = summary_tag.get_text(strip=True)
+        else:
+            alt_summary_tag = item.select_one("div.fz-mid.space-txt")
+            summary = alt_summary_tag.get_text(strip=True) if alt_summary_tag else ""
+        publisher_tag = item.find("div", class_="citeurl")
+        publisher = publisher_tag.get_text(strip=True) if publisher_tag else ""
+        time_tag = summary.split("-")
+        time_ = time_tag[0] if len(time_tag) == 2 else ""
+        if title and url:
+            results.append({"title": title, "publisher": publisher, "url": url, "summary": summary, "time": time_})
+    return results
+
+
+def legacy_quark(html, base_url):
+    soup = BeautifulSoup(html, "lxml")
+    items = soup.find_all("section", class_="sc sc_structure_template_normal")
+    results = []
+    for item in items:
+        title_tag = item.find("div", class_="qk-title-text")
+        title = title_tag.get_text(strip=True) if title_tag else ""
+        tags = item.find_all("span", class_="qk-source-item qk-clamp-1")
+        publisher = tags[0].get_text(strip=True) if tags else ""
+        time_ = tags[1].get_text(strip=True) if len(tags) == 2 else ""
+        url_tag = item.find("a", class_="qk-link-wrapper")
+        url = url_tag["href"] if url_tag else ""
+        summary_tag = item.find("div", class_="qk-paragraph-text")
+        summary = summary_tag.get_text(strip=True) if summary_tag else ""
+        results.append({"title": title, "publisher": publisher, "url": url, "summary": summary, "time": time_})
+    return results
+
+
+ENGINES = [
+    (BingSearch, "bing_serp.html", legacy_bing),
+    (BaiduSearch, "baidu_serp.html", legacy_baidu),
+    (SougouSearch, "sougou_serp.html", legacy_sougou),
+    (QuarkSearch, "quark_serp.html", legacy_quark),
+]
+
+
+def padded_fixture(engine, fixture: str, count: int) -> str:
+    """The fixture page with its result containers cloned up to `count` results, each with its own URLs."""
+    text = (FIXTURE_DIR / fixture).read_text(encoding="utf-8")
+    text = text.replace("{base}", BASE).replace("{query}", "广州天气")
+    root = lxml_html.document_fromstring(text)
+    containers = engine.result_parser.container(root)
+    parent = containers[0].getparent()
+    for i in range(len(containers), count):
+        clone = copy.deepcopy(containers[i % len(containers)])
+        for link in clone.iter("a"):
+            if link.get("href"):
+                link.set("href", f"{link.get('href')}?n={i}")
+        parent.append(clone)
+    return lxml_html.tostring(root, encoding="unicode")
+
+
+def measure(parse, html: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(html)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main(args):
+    print(f"{'engine':<8} {'results':>7} {'bs4 ms':>9} {'spec ms':>9} {'speedup':>8} {'bs4 KiB':>9} {'spec KiB':>9}")
+    for cls, fixture, legacy in ENGINES:
+        engine = cls(browser_pool=None)
+        engine.base_url = BASE
+        for count in args.results:
+            html = padded_fixture(cls, fixture, count)
+            old, old_s, old_peak = measure(lambda h: legacy(h, BASE), html, args.repeat)
+            new, new_s, new_peak = measure(engine.parsing, html, args.repeat)
+            # 旧的百度实现经 set 去重后顺序不固定，只比较 URL 集合
+            assert sorted(r["url"] for r in old) == sorted(r["url"] for r in new), f"{cls.name}: parsers disagree"
+            print(
+                f"{cls.name:<8} {len(new):>7} {old_s * 1000:>9.2f} {new_s * 1000:>9.2f} {old_s / new_s:>7.1f}x "
+                f"{old_peak / 1024:>9.0f} {new_peak / 1024:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,70 @@
+"""
+Compare per-page and batched cross-document reranking against a local fake embedding server.
+
+python -m bench.rerank_batching --pages 8 --latency 0.2
+"""
+import argparse
+import asyncio
+import time
+
+from reranker import OpenAIEmbeddingReranker, Chunker
+from .fake_openai import FakeOpenAIServer
+
+QUERY = "广州今日天气 气温 降雨"
+
+
+def make_page(index: int, paragraphs: int) -> str:
+    lines = [f"# 第 {index} 篇文章"]
+    for p in range(paragraphs):
+        lines.append(f"## 小节 {p}")
+        lines.append(
+            f"这是第 {index} 篇文章的第 {p} 段。广州今天多云，气温 26 到 33 度，午后有雷阵雨。"
+            f"Paragraph {p} of article {index} talks about the weather, traffic and local news in some detail. "
+            * 3
+        )
+    return "\n\n".join(lines)
+
+
+async def per_page(reranker: OpenAIEmbeddingReranker, pages):
+    # 旧实现：逐页切分、重复向量化 query、串行等待
+    results = []
+    for page in pages:
+        splitter = Chunker()
+        chunks = splitter.split_text(page)
+        results.append(await reranker.get_reranked_documents(QUERY, chunks, top_k=10))
+    return results
+
+
+async def batched(reranker: OpenAIEmbeddingReranker, pages):
+    splitter = Chunker()
+    groups = [splitter.split_text(page) for page in pages]
+    return await reranker.get_reranked_groups(QUERY, groups, top_k=10)
+
+
+async def main(args):
+    pages = [make_page(i, args.paragraphs) for i in range(args.pages)]
+    with FakeOpenAIServer(latency=args.latency, max_batch_size=args.batch_size) as server:
+        reranker = OpenAIEmbeddingReranker(base_url=server.url, api_key="fake", model="fake", max_batch_size=args.batch_size)
+        rows = []
+        outputs = {}
+        for label, pipeline in (("per-page", per_page), ("batched", batched)):
+            server.reset()
+            start = time.perf_counter()
+            outputs[label] = await pipeline(reranker, pages)
+            elapsed = time.perf_counter() - start
+            rows.append((label, elapsed, sum(server.requests.values())))
+
+    assert outputs["per-page"] == outputs["batched"], "batched reranking must pick the same chunks"
+    chunks = sum(len(Chunker().split_text(page)) for page in pages)
+    print(f"{args.pages} pages, {chunks} chunks, {args.latency:.2f}s per embedding request")
+    for label, elapsed, requests in rows:
+        print(f"{label:<9} {elapsed:7.2f}s  {requests:3d} round trips")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of the reranker scoring backends: import cost and top-k throughput.
+
+python -m bench.rerank_scoring --sizes 1000 10000 100000 --dim 1024
+"""
+import argparse
+import subprocess
+import sys
+import time
+import numpy as np
+
+from reranker.base import score_matrix, top_k_indices
+
+IMPORT_PROBE = """
+import resource, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def import_cost(module: str):
+    """Import time (s) and peak RSS (MB) of a fresh interpreter importing `module`."""
+    try:
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+    except subprocess.CalledProcessError:
+        return None
+    return float(output[0]), int(output[1]) / 1024
+
+
+def throughput(backend: str, queries: np.ndarray, documents: np.ndarray, top_k: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        top_k_indices(score_matrix(queries, documents, backend), top_k, backend)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    print("import cost (fresh interpreter)")
+    for module in ("numpy", "reranker.base", "torch"):
+        cost = import_cost(module)
+        if cost is None:
+            print(f"  {module:<14} not installed")
+        else:
+            print(f"  {module:<14} {cost[0] * 1000:8.1f} ms  {cost[1]:7.1f} MB peak RSS")
+
+    backends = ["numpy"]
+    if import_cost("torch") is not None:
+        backends.append("torch")
+
+    rng = np.random.default_rng(0)
+    print(f"\nscoring + top-{args.top_k}, dim {args.dim}, best of {args.repeat}")
+    for size in args.sizes:
+        documents = rng.standard_normal((size, args.dim), dtype=np.float32)
+        for n_queries in args.queries:
+            queries = rng.standard_normal((n_queries, args.dim), dtype=np.float32)
+            cells = []
+            for backend in backends:
+                seconds = throughput(backend, queries, documents, args.top_k, args.repeat)
+                cells.append(f"{backend} {seconds * 1000:8.2f} ms ({size * n_queries / seconds / 1e6:6.1f} M scores/s)")
+            print(f"  {size:>7} chunks x {n_queries} queries: " + "   ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
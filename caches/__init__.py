@@ -0,0 +1,7 @@
+from .memory import LRUCache
+from .sqlite_store import SQLiteStore
+from .serp_cache import SerpCache, CachedSearch, FreshnessPolicy
+from .embedding_cache import EmbeddingCache
+from .content_cache import ContentCache
+
+__all__ = ["LRUCache", "SQLiteStore", "SerpCache", "CachedSearch", "FreshnessPolicy", "EmbeddingCache", "ContentCache"]
\ No newline at end of file
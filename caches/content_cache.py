@@ -0,0 +1,70 @@
+import asyncio
+import json
+import zlib
+from typing import Optional
+from loguru import logger
+from engines.urls import canonicalize_url
+from .sqlite_store import SQLiteStore
+
+
+class ContentCache:
+    """Crawled pages keyed by canonical URL, kept in a SQLite store shared by all workers.
+
+    Pages are stored as zlib-compressed JSON. `get` and `set` run the store I/O and the
+    (de)compression in a worker thread; `contains` and `stats` are blocking and meant to be
+    called from one. Read and write errors are logged and treated as misses so that a
+    locked or broken cache never fails a crawl.
+    """
+
+    def __init__(self, store: SQLiteStore, ttl: float = 24 * 3600):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        return canonicalize_url(url)
+
+    def contains(self, url: str) -> bool:
+        try:
+            return self.store.contains(self.key(url))
+        except Exception as e:
+            logger.warning(f"content cache read failed: {e!r}")
+            return False
+
+    async def get(self, url: str) -> Optional[dict]:
+        try:
+            page = await asyncio.to_thread(self._read, self.key(url))
+        except Exception as e:
+            logger.warning(f"content cache read failed: {e!r}")
+            page = None
+        if page is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return page
+
+    async def set(self, url: str, page: dict):
+        try:
+            await asyncio.to_thread(self._write, self.key(url), page)
+        except Exception as e:
+            logger.warning(f"content cache write failed: {e!r}")
+
+    def _read(self, key: str) -> Optional[dict]:
+        value = self.store.get(key)
+        return json.loads(zlib.decompress(value)) if value is not None else None
+
+    def _write(self, key: str, page: dict):
+        value = zlib.compress(json.dumps(page, ensure_ascii=False).encode("utf-8"))
+        self.store.set(key, value, self.ttl)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.store),
+            "disk_bytes": self.store.size_bytes(),
+        }
@@ -0,0 +1,252 @@
+"""
+Content-addressed embedding cache.
+
+Vectors are appended as float16 to a flat file that is memory-mapped for reads, and a
+SQLite index maps hash(model, text) to the vector's offset. Several processes can share
+one cache directory: writers serialize on the SQLite write lock. Reads and the
+`last_used` refresh use a separate connection with a short busy timeout; when another
+process holds the write lock the refresh is skipped and a failed read counts as misses.
+All methods block, so async callers run them in a worker thread.
+
+python -m caches.embedding_cache stats --dir .cache/embeddings
+python -m caches.embedding_cache compact --dir .cache/embeddings --max-entries 1000000 --max-age-days 30
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import List, Optional, Sequence
+import numpy as np
+from loguru import logger
+
+DTYPE = np.float16
+
+
+class EmbeddingCache:
+
+    def __init__(self, directory: str, timeout: float = 30.0, read_timeout: float = 0.2):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._mapped_file = None
+        self._mmap = None
+        path = os.path.join(directory, "index.sqlite")
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # 已初始化的目录只读打开，不在导入时抢写锁
+        if not self._has_schema():
+            self._create_schema()
+        self._reader = sqlite3.connect(path, timeout=read_timeout, check_same_thread=False, isolation_level=None)
+        self._reader.execute("PRAGMA synchronous=NORMAL")
+
+    def _has_schema(self) -> bool:
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if not {"embeddings", "meta"} <= tables:
+            return False
+        return self.conn.execute("SELECT 1 FROM meta WHERE name = 'file'").fetchone() is not None
+
+    def _create_schema(self):
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key BLOB PRIMARY KEY, offset INTEGER NOT NULL, dim INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('file', 'vectors.0.f16')")
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def _current_file(self, conn: Optional[sqlite3.Connection] = None) -> str:
+        return (conn or self.conn).execute("SELECT value FROM meta WHERE name = 'file'").fetchone()[0]
+
+    def _view(self, filename: str, end: int) -> Optional[mmap.mmap]:
+        # 文件只追加，映射长度不够时重新映射；压缩后文件名会变化
+        if self._mmap is None or self._mapped_file != filename or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size < end:
+                        return None
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                return None
+            self._mapped_file = filename
+        return self._mmap
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return a float32 vector per text, or None where the text is not cached."""
+        keys = [self.key(model, text) for text in texts]
+        rows = {}
+        with self._lock:
+            try:
+                self._reader.execute("BEGIN")
+                try:
+                    filename = self._current_file(self._reader)
+                    unique = list(dict.fromkeys(keys))
+                    for i in range(0, len(unique), 500):
+                        batch = unique[i:i + 500]
+                        placeholders = ",".join("?" * len(batch))
+                        for key, offset, dim in self._reader.execute(
+                                f"SELECT key, offset, dim FROM embeddings WHERE key IN ({placeholders})", batch):
+                            rows[key] = (offset, dim)
+                finally:
+                    self._reader.execute("COMMIT")
+            except sqlite3.OperationalError as e:
+                # 数据库繁忙时按未命中处理，不等待
+                logger.warning(f"embedding cache read failed: {e!r}")
+                rows = {}
+
+            results = []
+            if rows:
+                end = max(offset + dim * np.dtype(DTYPE).itemsize for offset, dim in rows.values())
+                view = self._view(filename, end)
+                if view is None:
+                    rows = {}
+            for key in keys:
+                if key in rows:
+                    offset, dim = rows[key]
+                    results.append(np.frombuffer(view, dtype=DTYPE, count=dim, offset=offset).astype(np.float32))
+                else:
+                    results.append(None)
+
+        found = sum(v is not None for v in results)
+        self.hits += found
+        self.misses += len(results) - found
+        if rows:
+            self._touch(list(rows))
+        return results
+
+    def _touch(self, keys: List[bytes]):
+        try:
+            with self._lock:
+                self._reader.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(time.time(), key) for key in keys]
+                )
+        except sqlite3.OperationalError:
+            # 只影响淘汰顺序，写锁繁忙时跳过
+            pass
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=DTYPE)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("vectors must be a 2-D array with one row per text")
+        dim = vectors.shape[1]
+        keys = [self.key(model, text) for text in texts]
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE 同时作为跨进程的追加锁
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                path = os.path.join(self.directory, self._current_file())
+                with open(path, "ab") as f:
+                    start = f.tell()
+                    f.write(vectors.tobytes())
+                row_bytes = dim * vectors.itemsize
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, offset, dim, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, start + i * row_bytes, dim, now) for i, key in enumerate(keys)],
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def compact(self, max_entries: Optional[int] = None, max_age: Optional[float] = None) -> dict:
+        """Drop entries unused for `max_age` seconds or beyond the `max_entries` most recent,
+        and rewrite the vector file without dead space."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                old_file = self._current_file()
+                generation = int(old_file.split(".")[1]) + 1
+                new_file = f"vectors.{generation}.f16"
+                query = "SELECT key, offset, dim, last_used FROM embeddings"
+                params = []
+                if max_age is not None:
+                    query += " WHERE last_used >= ?"
+                    params.append(time.time() - max_age)
+                query += " ORDER BY last_used DESC"
+                if max_entries is not None:
+                    query += " LIMIT ?"
+                    params.append(max_entries)
+                kept = self.conn.execute(query, params).fetchall()
+
+                old_path = os.path.join(self.directory, old_file)
+                new_path = os.path.join(self.directory, new_file)
+                itemsize = np.dtype(DTYPE).itemsize
+                rows = []
+                with open(new_path, "wb") as out:
+                    if kept:
+                        with open(old_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as src:
+                            for key, offset, dim, last_used in kept:
+                                rows.append((key, out.tell(), dim, last_used))
+                                out.write(src[offset:offset + dim * itemsize])
+                    out.flush()
+                    os.fsync(out.fileno())
+
+                before = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                self.conn.execute("DELETE FROM embeddings")
+                self.conn.executemany("INSERT INTO embeddings (key, offset, dim, last_used) VALUES (?, ?, ?, ?)", rows)
+                self.conn.execute("UPDATE meta SET value = ? WHERE name = 'file'", (new_file,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        # 其它进程已映射的旧文件在 unlink 后仍然可读
+        if os.path.exists(old_path):
+            os.remove(old_path)
+        return {"before": before, "after": len(rows), "file_bytes": os.path.getsize(new_path)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            path = os.path.join(self.directory, self._current_file())
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "file_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._reader.close()
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or compact an embedding cache directory.")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--dir", default=os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings"))
+    parser.add_argument("--max-entries", type=int, default=None)
+    parser.add_argument("--max-age-days", type=float, default=None)
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.dir)
+    if args.command == "compact":
+        max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+        print(cache.compact(max_entries=args.max_entries, max_age=max_age))
+    else:
+        print(cache.stats())
+    cache.close()
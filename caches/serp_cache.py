@@ -0,0 +1,126 @@
+import asyncio
+import json
+import re
+import time
+import unicodedata
+from typing import List, Optional, Sequence
+from loguru import logger
+from .memory import LRUCache
+from .sqlite_store import SQLiteStore
+
+# 时效性强的查询只缓存很短时间
+TIME_SENSITIVE_PATTERN = (
+    r"天气|气温|新闻|今天|今日|明天|昨天|本周|现在|最新|实时|快讯|股价|股市|汇率|油价|金价|比分|赛程|直播|热搜|"
+    r"\b(?:weather|news|today|tonight|tomorrow|latest|live|breaking|stocks?|prices?|scores?)\b"
+)
+
+
+def normalize_query(query: str) -> str:
+    """NFKC-normalize, lowercase, collapse whitespace and strip surrounding punctuation."""
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = " ".join(query.split())
+    return query.strip(" ?!.,;:？！。，；：、")
+
+
+class FreshnessPolicy:
+    """Picks a TTL per query: short for time-sensitive queries, long otherwise."""
+
+    def __init__(self, default_ttl: float = 6 * 3600, fresh_ttl: float = 600, pattern: str = TIME_SENSITIVE_PATTERN):
+        self.default_ttl = default_ttl
+        self.fresh_ttl = fresh_ttl
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+
+    def ttl(self, query: str) -> float:
+        return self.fresh_ttl if self.pattern.search(query) else self.default_ttl
+
+
+class SerpCache:
+    """Two-tier cache of parsed SERP results keyed by (engine, normalized query).
+
+    Lookups go to the in-process LRU first and then to the optional persistent store,
+    promoting disk hits into memory. Values are kept as JSON bytes in both tiers. Store
+    reads and writes run in a worker thread so a busy SQLite file never blocks the loop.
+    """
+
+    def __init__(
+            self,
+            memory: Optional[LRUCache] = None,
+            store: Optional[SQLiteStore] = None,
+            policy: Optional[FreshnessPolicy] = None,
+    ):
+        self.memory = memory or LRUCache(max_entries=4096, max_bytes=64 * 1024 * 1024)
+        self.store = store
+        self.policy = policy or FreshnessPolicy()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(engine: str, query: str) -> str:
+        return f"{engine}:{normalize_query(query)}"
+
+    async def get(self, engine: str, query: str) -> Optional[List[dict]]:
+        key = self.key(engine, query)
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return json.loads(value)
+        if self.store is not None:
+            try:
+                entry = await asyncio.to_thread(self.store.get_entry, key)
+            except Exception as e:
+                logger.warning(f"serp cache read failed: {e!r}")
+                entry = None
+            if entry is not None:
+                value, expires_at = entry
+                self.disk_hits += 1
+                self.memory.set(key, value, expires_at - time.time(), len(value))
+                return json.loads(value)
+        self.misses += 1
+        return None
+
+    async def set(self, engine: str, query: str, results: List[dict]):
+        key = self.key(engine, query)
+        ttl = self.policy.ttl(query)
+        value = json.dumps(results, ensure_ascii=False).encode("utf-8")
+        self.memory.set(key, value, ttl, len(value))
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.set, key, value, ttl)
+            except Exception as e:
+                logger.warning(f"serp cache write failed: {e!r}")
+
+    def stats(self) -> dict:
+        """Hit counts and sizes; `disk_bytes` queries the store, so call it off the event loop."""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.bytes,
+            "disk_bytes": self.store.size_bytes() if self.store is not None else 0,
+        }
+
+
+class CachedSearch:
+    """Wraps an engine so that only uncached sub-queries reach `response()`."""
+
+    def __init__(self, search, cache: SerpCache):
+        self.search = search
+        self.cache = cache
+        self.name = search.name
+
+    async def response(self, questions: Optional[Sequence[str]]) -> Optional[dict]:
+        questions = list(dict.fromkeys(questions or []))
+        cached = await asyncio.gather(*(self.cache.get(self.name, q) for q in questions))
+        found = {q: result for q, result in zip(questions, cached) if result}
+        missing = [q for q in questions if q not in found]
+        if missing:
+            fetched = await self.search.response(missing)
+            fetched = {q: result for q, result in fetched.items() if result}
+            await asyncio.gather(*(self.cache.set(self.name, q, result) for q, result in fetched.items()))
+            found.update(fetched)
+        return {q: found[q] for q in questions if q in found}
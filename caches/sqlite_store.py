@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Optional, Tuple
+
+
+class SQLiteStore:
+    """Persistent key/value store with expiry, backed by SQLite.
+
+    The database runs in WAL mode so that several worker processes can read and write
+    the same file concurrently. Expired rows are skipped on read and purged every
+    `purge_every` writes.
+    """
+
+    def __init__(self, path: str, table: str = "kv", purge_every: int = 500):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = Lock()
+        self.conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return (value, expires_at) for a live key."""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self.conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),))
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            row = self.conn.execute(f"SELECT COALESCE(SUM(LENGTH(value)), 0) FROM {self.table}").fetchone()
+        return row[0]
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
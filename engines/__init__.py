@@ -2,6 +2,8 @@ from .bingsearch import BingSearch
 from .quarksearch import QuarkSearch
 from .baidusearch import BaiduSearch
 from .sougousearch import SougouSearch
+from .meta import MetaSearch, search_options_from_env
+from .readiness import ReadinessSpec
 
 
-__all__ = ["BingSearch", "QuarkSearch", "BaiduSearch", "SougouSearch"]
\ No newline at end of file
+__all__ = ["BingSearch", "QuarkSearch", "BaiduSearch", "SougouSearch", "MetaSearch", "ReadinessSpec", "search_options_from_env"]
\ No newline at end of file
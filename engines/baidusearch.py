@@ -1,68 +1,37 @@
-from typing import List, Optional
-from bs4 import BeautifulSoup
-from pools import BrowserPool, BrowserPlaywright
-import json
-class BaiduSearch:
-
-    def __init__(self, browser_pool: BrowserPool):
-        self.browser_pool = browser_pool
-        self.base_url = "https://www.baidu.com/"
-
-    async def response(self, questions: Optional[List[str]]) -> Optional[dict]:
-        results = {}
-        async with self.browser_pool.get_browser() as browser:
-            for question in questions:
-                html = await self.run(browser=browser, question=question)
-                result = self.parsing(html)
-                if result:
-                    results[question] = result
-
-        return results
+from typing import Optional
+from urllib.parse import quote_plus
+from pools import BrowserPlaywright
+from runtime.metrics import span
+from .base import BaseSearch
+from .readiness import ReadinessSpec
+from .parser import Field, SelectorSpec
+
+class BaiduSearch(BaseSearch):
+    name = "baidu"
+    base_url_env = "BAIDU_BASE_URL"
+    default_base_url = "https://www.baidu.com"
+    readiness = ReadinessSpec(selector="div.c-container", min_count=3)
+    captcha_markers = ("wappass.baidu.com", "百度安全验证")
+    result_spec = SelectorSpec(
+        container="div.c-container",
+        fields={
+            "title": Field("h3.c-title.t.tts-title"),
+            "publisher": Field("a.siteLink_9TPP3"),
+            "url": Field("a.siteLink_9TPP3", attr="href"),
+            "summary": Field("span.content-right_2s-H4"),
+            "time": Field("span.c-color-gray2"),
+        },
+    )
+
+    def search_url(self, question: str) -> Optional[str]:
+        return f"{self.base_url}/s?wd={quote_plus(question)}"
 
     async def run(self, browser: BrowserPlaywright, question: Optional[str]):
-        context = await browser.browser.new_context()
-        page = await context.new_page()
-        await page.goto(self.base_url)
-
-        await page.fill('input[name="wd"]', question)
-        await page.wait_for_timeout(1000)
-        await page.click('input#su')
-        await page.wait_for_selector('div.c-container')  # 等待搜索结果加载完成
-        await page.wait_for_timeout(1000)
-        html = await page.content()
-        await page.close()
-        await context.close()
+        async with browser.get_page(self.name, self.base_url, self.resource_overrides, **self.context_options) as page:
+            with span("engine_navigate", engine=self.name):
+                await page.fill('input[name="wd"]', question)
+                await self.readiness.pre_submit(page)
+                await page.click('input#su')
+            await self.wait_until_ready(page)  # 等待搜索结果加载完成
+            html = await page.content()
         return html
-
-    def parsing(self, html: Optional[str]) -> Optional[List[dict]]:
-        soup = BeautifulSoup(html, "lxml")
-        items = soup.find_all("div", class_="c-container")
-        results = []
-        for item in items:
-            title_tag = item.find('h3', class_='c-title t t tts-title')
-            title = title_tag.get_text(strip=True) if title_tag else ''
-
-            publisher_tag = item.find('a', class_='siteLink_9TPP3')
-            publisher = publisher_tag.get_text(strip=True) if publisher_tag else ''
-
-            url_tag = item.find('a', class_='siteLink_9TPP3')
-            url = url_tag['href'] if url_tag else ''
-
-            summary_tag = item.find('span', class_='content-right_2s-H4')
-            summary = summary_tag.get_text(strip=True) if summary_tag else ''
-
-            time_tag = item.find("span", class_="c-color-gray2")
-            time = time_tag.get_text(strip=True) if time_tag else ''
-
-            data = {
-                "title": title,
-                "publisher": publisher,
-                "url": url,
-                "summary": summary,
-                "time": time
-            }
-            if url:
-                results.append(data)
-            results = [json.loads(x) for x in set(json.dumps(d, sort_keys=True) for d in results)]
-        return results
-
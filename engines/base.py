@@ -0,0 +1,182 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List, Optional
+import httpx
+from loguru import logger
+from pools import BrowserPool, BrowserPlaywright
+from runtime.deadline import clamp, remaining
+from runtime.executor import get_executor
+from runtime.metrics import observe, span
+from .http_client import get_http_client
+from .parser import ResultParser, SelectorSpec
+from .readiness import ReadinessSpec, wait_for_ready
+
+
+def parse_html(engine_cls: type, base_url: str, html: Optional[str]) -> Optional[List[dict]]:
+    """Parse `html` as `engine_cls` would; module-level so it can run in a process pool."""
+    # 解析只依赖 base_url，不需要浏览器池，跳过 __init__
+    engine = object.__new__(engine_cls)
+    engine.base_url = base_url
+    return engine.parsing(html)
+
+
+class BaseSearch(ABC):
+    """
+    Abstract base class for search engine implementations.
+
+    Sub-queries are fanned out concurrently, at most `concurrency` at a time, each in
+    its own browser context. Every query gets its own timeout; a failed query is logged
+    and dropped without discarding the others. `concurrency=1` restores the sequential
+    behaviour, and `spread=True` checks out a separate pooled browser per query.
+
+    Each engine declares a `readiness` spec; pass `readiness=` to override it, e.g. to
+    bring back fixed sleeps for a flaky engine.
+
+    With `fetch_mode="direct"` the results URL is first requested over the shared httpx
+    client and parsed as-is; the browser is only used when that request fails, hits a
+    captcha or yields no results. Engines without a `search_url` always use the browser.
+    """
+
+    name: str = ""
+    # 首页地址，可用环境变量 base_url_env 覆盖（如指向 bench/fixture_server.py 的本地夹具服务器）
+    base_url_env: str = ""
+    default_base_url: str = ""
+    # 创建浏览器上下文时的参数（如 user_agent）
+    context_options: dict = {}
+    readiness: ReadinessSpec = None
+    # 出现在验证码/风控页面中的标记
+    captcha_markers: tuple = ()
+    # 在浏览器池资源策略基础上的覆盖，如 {"allow_types": ("script",)}（见 pools/resource_policy.py）
+    resource_overrides: dict = {}
+    # 结果列表的选择器描述，子类定义后在类创建时编译
+    result_spec: SelectorSpec = None
+    result_parser: ResultParser = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get("result_spec") is not None:
+            cls.result_parser = ResultParser(cls.result_spec)
+
+    def __init__(
+            self,
+            browser_pool: BrowserPool,
+            concurrency: int = 3,
+            query_timeout: float = 30.0,
+            spread: bool = False,
+            readiness: Optional[ReadinessSpec] = None,
+            fetch_mode: str = "browser",
+    ):
+        if fetch_mode not in ("browser", "direct"):
+            raise ValueError(f"Unknown fetch_mode: {fetch_mode}")
+        self.browser_pool = browser_pool
+        self.concurrency = max(1, concurrency)
+        self.query_timeout = query_timeout
+        self.spread = spread
+        self.fetch_mode = fetch_mode
+        # 统一去掉末尾的 /，子类拼接路径时自带 /
+        base_url = os.getenv(self.base_url_env) if self.base_url_env else None
+        self.base_url = (base_url or self.default_base_url).rstrip("/")
+        if readiness is not None:
+            self.readiness = readiness
+        # 最近若干次的就绪阶段耗时（ms）
+        self.readiness_timings = deque(maxlen=256)
+
+    @abstractmethod
+    async def run(self, browser: BrowserPlaywright, question: Optional[str]) -> str:
+        pass
+
+    def parsing(self, html: Optional[str]) -> Optional[List[dict]]:
+        return self.result_parser.parse(html, self.postprocess)
+
+    async def parse(self, html: Optional[str]) -> Optional[List[dict]]:
+        return await get_executor().run(parse_html, type(self), self.base_url, html)
+
+    def postprocess(self, result: dict) -> Optional[dict]:
+        """Adjust one raw result (missing fields are None); return None to drop it."""
+        return result
+
+    def search_url(self, question: str) -> Optional[str]:
+        """Results URL for `question`, or None if the engine cannot be fetched directly."""
+        return None
+
+    def is_blocked(self, url: str, html: str) -> bool:
+        return any(marker in url or marker in html for marker in self.captcha_markers)
+
+    async def wait_until_ready(self, page) -> dict:
+        timings = await wait_for_ready(page, self.readiness)
+        self.readiness_timings.append(timings)
+        observe("engine_readiness", timings["total"] / 1000, engine=self.name)
+        logger.debug(f"{self.name} readiness: " + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items()))
+        return timings
+
+    async def prewarm(self, count: Optional[int] = None):
+        """Pre-create warm pages for this engine on a pooled browser."""
+        async with self.browser_pool.get_browser() as browser:
+            await browser.prewarm(self.name, self.base_url, count, self.resource_overrides, **self.context_options)
+
+    async def response(self, questions: Optional[List[str]]) -> Optional[dict]:
+        # 去重但保持顺序，结果按问题顺序返回
+        questions = list(dict.fromkeys(questions or []))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if self.spread or self.fetch_mode == "direct":
+            outputs = await asyncio.gather(*(self._search_question(question, semaphore) for question in questions))
+        else:
+            async with self.browser_pool.get_browser() as browser:
+                outputs = await asyncio.gather(*(self._search(browser, question, semaphore) for question in questions))
+
+        results = {}
+        for question, result in zip(questions, outputs):
+            if result:
+                results[question] = result
+        return results
+
+    async def _search_question(self, question: str, semaphore: asyncio.Semaphore) -> Optional[List[dict]]:
+        async with semaphore:
+            if self.fetch_mode == "direct" and self.search_url(question):
+                result = await self._search_direct(question)
+                if result:
+                    return result
+            async with self.browser_pool.get_browser() as browser:
+                return await self._search_one(browser, question)
+
+    async def _search(self, browser: BrowserPlaywright, question: str, semaphore: asyncio.Semaphore) -> Optional[List[dict]]:
+        async with semaphore:
+            return await self._search_one(browser, question)
+
+    async def _search_direct(self, question: str) -> Optional[List[dict]]:
+        try:
+            # 请求截止时间早于客户端超时时以截止时间为准
+            with span("engine_query", engine=self.name, mode="direct"):
+                response = await asyncio.wait_for(get_http_client().get(self.search_url(question)), remaining())
+            response.raise_for_status()
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            logger.info(f"{self.name} direct fetch failed for {question!r}, falling back to browser: {e!r}")
+            return None
+        html = response.text
+        if self.is_blocked(str(response.url), html):
+            logger.info(f"{self.name} direct fetch hit a captcha for {question!r}, falling back to browser")
+            return None
+        try:
+            with span("engine_parse", engine=self.name):
+                result = await self.parse(html)
+        except Exception as e:
+            logger.info(f"{self.name} could not parse direct response for {question!r}, falling back to browser: {e!r}")
+            return None
+        if not result:
+            logger.info(f"{self.name} direct fetch returned no results for {question!r}, falling back to browser")
+        return result
+
+    async def _search_one(self, browser: BrowserPlaywright, question: str) -> Optional[List[dict]]:
+        timeout = clamp(self.query_timeout)
+        try:
+            with span("engine_query", engine=self.name, mode="browser"):
+                html = await asyncio.wait_for(self.run(browser=browser, question=question), timeout)
+            with span("engine_parse", engine=self.name):
+                return await self.parse(html)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} search timed out after {timeout:.1f}s: {question!r}")
+        except Exception as e:
+            logger.warning(f"{self.name} search failed for {question!r}: {e!r}")
+        return None
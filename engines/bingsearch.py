@@ -1,74 +1,52 @@
-from typing import List, Optional
+from typing import Optional
+from urllib.parse import quote_plus
 import unicodedata
-from bs4 import BeautifulSoup
-from pools import BrowserPool, BrowserPlaywright
-
-class BingSearch:
-
-    def __init__(self, browser_pool: BrowserPool):
-        self.browser_pool = browser_pool
-        self.base_url = "https://cn.bing.com"
-
-    async def response(self, questions: Optional[List[str]]) -> Optional[dict]:
-        results = {}
-        async with self.browser_pool.get_browser() as browser:
-            for question in questions:
-                html = await self.run(browser=browser, question=question)
-                result = self.parsing(html)
-                if result:
-                    results[question] = result
-
-        return results
+from pools import BrowserPlaywright
+from runtime.metrics import span
+from .base import BaseSearch
+from .parser import Field, SelectorSpec
+from .readiness import ReadinessSpec
+
+class BingSearch(BaseSearch):
+    name = "bing"
+    base_url_env = "BING_BASE_URL"
+    default_base_url = "https://cn.bing.com"
+    readiness = ReadinessSpec(selector="li.b_algo", min_count=3)
+    captcha_markers = ("/turing/captcha", "b_captcha")
+    result_spec = SelectorSpec(
+        container="li.b_algo",
+        fields={
+            "title": Field("h2"),
+            "publisher": Field("a.tilk", attr="aria-label"),
+            "url": Field("a.tilk", attr="href"),
+            "summary": Field("p"),
+        },
+    )
+
+    def search_url(self, question: str) -> Optional[str]:
+        return f"{self.base_url}/search?q={quote_plus(question)}"
 
     async def run(self, browser: BrowserPlaywright, question: Optional[str]):
-        context = await browser.browser.new_context()
-        page = await context.new_page()
-        await page.goto(self.base_url)
-
-        # 输入搜索内容并执行搜索
-        await page.fill('input#sb_form_q', question)
-        await page.wait_for_timeout(500)
-        await page.keyboard.press('Enter')
-        await page.wait_for_selector('li.b_algo')  # 等待搜索结果加载完成
-        await page.wait_for_timeout(2000)
-        html = await page.content()
-        await page.close()
-        await context.close()
+        async with browser.get_page(self.name, self.base_url, self.resource_overrides, **self.context_options) as page:
+            # 输入搜索内容并执行搜索
+            with span("engine_navigate", engine=self.name):
+                await page.fill('input#sb_form_q', question)
+                await self.readiness.pre_submit(page)
+                await page.keyboard.press('Enter')
+            await self.wait_until_ready(page)  # 等待搜索结果加载完成
+            html = await page.content()
         return html
 
-    def parsing(self, html: Optional[str]) -> Optional[List[dict]]:
-        soup = BeautifulSoup(html, "lxml")
-        items = soup.find_all("li", class_=lambda x: x and "b_algo" in x)
-        results = []
-        for item in items:
-            publisher_tag = item.find("a", class_="tilk")
-            publisher = publisher_tag.get("aria-label")
-            url = publisher_tag.get("href")
-
-            if item.find("p"):
-                content = unicodedata.normalize("NFKC", item.find("p").get_text(strip=True))
-                content_list = content.split(" · ")
-                if len(content_list) == 2:
-                    time = content_list[0]
-                    summary = content_list[1]
-                else:
-                    time = "UNKNOW"
-                    summary = content_list[0]
-            else:
-                time = ""
-                summary = ""
-
-            title_tag = item.find("h2")
-            title = title_tag.get_text(strip=True)
-
-            data = {
-                "title": title,
-                "publisher": publisher,
-                "url": url,
-                "summary": summary,
-                "time": time
-            }
-            results.append(data)
-
-        return results
-
+    def postprocess(self, result: dict) -> Optional[dict]:
+        if result["summary"] is None:
+            result["time"] = ""
+            return result
+        # 摘要形如 “2025年6月1日 · 正文”
+        content = unicodedata.normalize("NFKC", result["summary"])
+        content_list = content.split(" · ")
+        if len(content_list) == 2:
+            result["time"], result["summary"] = content_list
+        else:
+            result["time"] = "UNKNOW"
+            result["summary"] = content_list[0]
+        return result
@@ -0,0 +1,46 @@
+import asyncio
+import weakref
+from typing import Optional
+import httpx
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Sec-Ch-Ua": '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# httpx 客户端与事件循环绑定，每个事件循环共享一个连接池；事件循环被回收后条目自动删除
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the connection-pooled HTTP/2 client shared by all engines on this event loop."""
+    loop = asyncio.get_running_loop()
+    # 连接池中的连接可能仍引用已关闭的事件循环，弱引用回收不了，这里顺带清理
+    for closed in [other for other in _clients if other.is_closed()]:
+        del _clients[closed]
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_http_client(loop: Optional[asyncio.AbstractEventLoop] = None):
+    client = _clients.pop(loop or asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
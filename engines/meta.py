@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+from loguru import logger
+from pools import BrowserPool
+from runtime.deadline import clamp
+from .baidusearch import BaiduSearch
+from .bingsearch import BingSearch
+from .quarksearch import QuarkSearch
+from .sougousearch import SougouSearch
+from .urls import canonicalize_url
+
+ENGINES = {
+    "bing": BingSearch,
+    "baidu": BaiduSearch,
+    "sougou": SougouSearch,
+    "quark": QuarkSearch,
+}
+
+
+class LatencyTracker:
+    """Sliding window of successful response latencies per engine."""
+
+    def __init__(self, window: int = 200, default: float = 3.0, min_samples: int = 5):
+        self.window = window
+        self.default = default
+        self.min_samples = min_samples
+        self.samples: Dict[str, deque] = {}
+
+    def record(self, engine: str, seconds: float):
+        self.samples.setdefault(engine, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, engine: str, q: float = 0.9) -> float:
+        samples = self.samples.get(engine)
+        if not samples or len(samples) < self.min_samples:
+            return self.default
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# 进程内共享，WebTools 每次调用都会新建 MetaSearch
+latency_tracker = LatencyTracker()
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[List[dict]], k: int = 60) -> List[dict]:
+    """Fuse ranked result lists with RRF, deduplicating by canonical URL.
+
+    A result found by several engines keeps the first engine's fields, with empty fields
+    filled in from later duplicates.
+    """
+    scores: Dict[str, float] = {}
+    items: Dict[str, dict] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results):
+            key = canonicalize_url(item.get("url", ""))
+            if not key:
+                continue
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            if key not in items:
+                items[key] = dict(item)
+            else:
+                merged = items[key]
+                for field, value in item.items():
+                    if value and not merged.get(field):
+                        merged[field] = value
+    return [items[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def _per_engine(value: Optional[str]) -> Dict[str, str]:
+    # "direct" 作用于所有引擎，"bing:direct,baidu:browser" 按引擎配置
+    if not value:
+        return {}
+    if ":" not in value:
+        return {name: value.strip() for name in ENGINES}
+    pairs = (item.split(":", 1) for item in value.split(",") if ":" in item)
+    return {name.strip(): mode.strip() for name, mode in pairs}
+
+
+def search_options_from_env(engine: str) -> dict:
+    """Engine options for `engine` from the environment, as passed to WebTools(search_options=...).
+
+    SEARCH_FETCH_MODE sets `fetch_mode` for every engine ("direct") or per engine
+    ("bing:direct,baidu:browser"). For "meta", META_ENGINES, META_QUORUM, META_HEDGE=1 and
+    META_DEADLINE configure the MetaSearch itself.
+    """
+    modes = _per_engine(os.getenv("SEARCH_FETCH_MODE"))
+    if engine != "meta":
+        return {"fetch_mode": modes[engine]} if engine in modes else {}
+    options = {}
+    if os.getenv("META_ENGINES"):
+        options["engines"] = [name.strip() for name in os.getenv("META_ENGINES").split(",") if name.strip()]
+    if os.getenv("META_QUORUM"):
+        options["quorum"] = int(os.getenv("META_QUORUM"))
+    if os.getenv("META_DEADLINE"):
+        options["deadline"] = float(os.getenv("META_DEADLINE"))
+    options["hedge"] = os.getenv("META_HEDGE") == "1"
+    options["engine_options"] = {name: {"fetch_mode": mode} for name, mode in modes.items()}
+    return options
+
+
+class MetaSearch:
+    """Query several engines concurrently and fuse their results.
+
+    Every engine runs under its own deadline. The search returns as soon as `quorum`
+    engines have answered or the overall `deadline` has passed, cancelling the rest.
+    With `hedge=True` the engines are started one at a time instead: the next engine
+    only starts if the previous one failed or has not answered within its p90 latency,
+    and the first successful answer is returned (the quorum is 1) with the rest cancelled.
+
+    Extra keyword arguments (concurrency, fetch_mode, ...) are passed to every engine;
+    `engine_options` overrides them per engine, e.g. {"bing": {"fetch_mode": "direct"}}.
+    """
+
+    name = "meta"
+
+    def __init__(
+            self,
+            browser_pool: BrowserPool,
+            engines: Sequence[str] = ("bing", "sougou", "baidu"),
+            quorum: int = 2,
+            deadline: float = 15.0,
+            engine_deadlines: Optional[Dict[str, float]] = None,
+            hedge: bool = False,
+            rrf_k: int = 60,
+            engine_options: Optional[Dict[str, dict]] = None,
+            **engine_kwargs,
+    ):
+        unknown = [e for e in engines if e not in ENGINES]
+        if unknown:
+            raise ValueError(f"Unknown engines: {unknown}")
+        self.engines = list(engines)
+        engine_options = engine_options or {}
+        self.searches = {
+            name: ENGINES[name](browser_pool=browser_pool, **{**engine_kwargs, **engine_options.get(name, {})})
+            for name in self.engines
+        }
+        self.quorum = max(1, min(quorum, len(self.engines)))
+        self.deadline = deadline
+        self.engine_deadlines = engine_deadlines or {}
+        self.hedge = hedge
+        self.rrf_k = rrf_k
+
+    async def response(self, questions: Optional[List[str]]) -> Optional[dict]:
+        questions = list(dict.fromkeys(questions or []))
+        outputs = await self._collect(questions)
+        results = {}
+        for question in questions:
+            fused = reciprocal_rank_fusion([outputs[name].get(question, []) for name in self.engines if name in outputs], self.rrf_k)
+            if fused:
+                results[question] = fused
+        return results
+
+    async def _run_engine(self, name: str, questions: List[str]) -> dict:
+        start = time.perf_counter()
+        result = await asyncio.wait_for(
+            self.searches[name].response(questions),
+            clamp(self.engine_deadlines.get(name, self.deadline)),
+        )
+        if result:
+            latency_tracker.record(name, time.perf_counter() - start)
+        return result
+
+    async def _collect(self, questions: List[str]) -> Dict[str, dict]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + clamp(self.deadline)
+        waiting = list(self.engines)
+        pending: Dict[asyncio.Task, str] = {}
+        outputs: Dict[str, dict] = {}
+        hedge_at = None
+        # 对冲的目的是尽快拿到一个结果，备用引擎只是兜底
+        quorum = 1 if self.hedge else self.quorum
+
+        def launch():
+            nonlocal hedge_at
+            name = waiting.pop(0)
+            pending[asyncio.create_task(self._run_engine(name, questions))] = name
+            if self.hedge:
+                hedge_at = loop.time() + latency_tracker.quantile(name, 0.9)
+
+        launch()
+        while waiting and not self.hedge:
+            launch()
+
+        try:
+            while pending and len(outputs) < quorum:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                timeout = deadline - now
+                if self.hedge and waiting:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                failed = False
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        logger.warning(f"meta search: {name} missed its deadline")
+                        result = None
+                    except Exception as e:
+                        logger.warning(f"meta search: {name} failed: {e!r}")
+                        result = None
+                    if result:
+                        outputs[name] = result
+                    else:
+                        failed = True
+
+                # 对冲：失败或超过 p90 仍未返回时启动下一个引擎
+                if self.hedge and waiting and len(outputs) < quorum:
+                    if failed or not pending or loop.time() >= hedge_at:
+                        launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        logger.debug(f"meta search answered by {list(outputs)}")
+        return outputs
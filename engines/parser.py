@@ -0,0 +1,120 @@
+"""
+Declarative SERP parsing.
+
+An engine describes its result container and fields as a `SelectorSpec`; the spec is compiled
+once into lxml XPath expressions and applied to every page:
+
+    spec = SelectorSpec(
+        container="div.c-container",
+        fields={
+            "title": Field("h3.c-title"),
+            "url": Field("a.siteLink_9TPP3", attr="href"),
+        },
+    )
+    results = ResultParser(spec).parse(html)
+
+Missing fields are None when `postprocess` runs and "" in the returned dicts. Results are
+deduplicated by canonical URL in a single pass, keeping the first occurrence.
+"""
+from dataclasses import dataclass, field as dataclass_field
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from cssselect import GenericTranslator
+from lxml import etree, html as lxml_html
+from .urls import canonicalize_url
+
+RESULT_FIELDS = ("title", "publisher", "url", "summary", "time")
+
+_translator = GenericTranslator()
+# 与 BeautifulSoup 的 get_text 一致：不包含 script/style 中的文本
+_text = etree.XPath("descendant-or-self::text()[not(parent::script or parent::style)]")
+
+
+@dataclass(frozen=True)
+class Field:
+    """How to read one field, relative to the result container.
+
+    `css` may be a tuple of selectors tried in order (the first that matches wins); an empty
+    selector means the container itself. Text is read unless `attr` is given; `many=True`
+    returns every match as a list.
+    """
+    css: Union[str, Tuple[str, ...]] = ""
+    attr: Optional[str] = None
+    many: bool = False
+
+
+@dataclass(frozen=True)
+class SelectorSpec:
+    container: str
+    fields: Dict[str, Field] = dataclass_field(default_factory=dict)
+    # 缺少这些字段的结果会被丢弃
+    required: Tuple[str, ...] = ("url",)
+
+
+def css_to_xpath(css: str) -> etree.XPath:
+    return etree.XPath(_translator.css_to_xpath(css, prefix="descendant::"))
+
+
+def element_text(element) -> str:
+    return "".join(text.strip() for text in _text(element))
+
+
+class _CompiledField:
+
+    def __init__(self, spec: Field):
+        selectors = (spec.css,) if isinstance(spec.css, str) else spec.css
+        self.xpaths = [etree.XPath("self::*") if not css else css_to_xpath(css) for css in selectors]
+        self.attr = spec.attr
+        self.many = spec.many
+
+    def read(self, element) -> Union[None, str, List[str]]:
+        for xpath in self.xpaths:
+            matches = xpath(element)
+            if not matches:
+                continue
+            if self.many:
+                return [self._value(match) for match in matches]
+            return self._value(matches[0])
+        return [] if self.many else None
+
+    def _value(self, element) -> Optional[str]:
+        if self.attr is None:
+            return element_text(element)
+        return element.get(self.attr)
+
+
+class ResultParser:
+    """A `SelectorSpec` compiled to XPath; reusable across pages and threads."""
+
+    def __init__(self, spec: SelectorSpec):
+        self.spec = spec
+        self.container = css_to_xpath(spec.container)
+        self.fields = {name: _CompiledField(f) for name, f in spec.fields.items()}
+
+    def parse(self, html: Optional[str], postprocess: Optional[Callable[[dict], Optional[dict]]] = None) -> List[dict]:
+        """Parse a results page. `postprocess` may rewrite each raw result or return None to drop it."""
+        if not html or not html.strip():
+            return []
+        try:
+            root = lxml_html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            return []
+
+        results = []
+        seen = set()
+        for item in self.container(root):
+            raw = {name: f.read(item) for name, f in self.fields.items()}
+            if postprocess is not None:
+                raw = postprocess(raw)
+                if raw is None:
+                    continue
+            if any(not raw.get(name) for name in self.spec.required):
+                continue
+            result = {name: raw.get(name) or "" for name in RESULT_FIELDS}
+            # 按规范化 URL 线性去重，保留第一次出现的结果
+            key = canonicalize_url(result["url"])
+            if key:
+                if key in seen:
+                    continue
+                seen.add(key)
+            results.append(result)
+        return results
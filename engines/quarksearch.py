@@ -1,82 +1,51 @@
-from typing import Optional, List
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-from pools import BrowserPool, BrowserPlaywright
-
-class QuarkSearch:
-    def __init__(self, browser_pool: BrowserPool):
-        self.browser_pool = browser_pool
-        self.base_url = "https://ai.quark.cn/"
-
-    async def response(self, questions: Optional[List[str]]) -> Optional[dict]:
-        results = {}
-        async with self.browser_pool.get_browser() as browser:
-            for question in questions:
-                html = await self.run(browser=browser, question=question)
-                result = self.parsing(html)
-                if result:
-                    results[question] = result
-        return results
+from typing import Optional
+from pools import BrowserPlaywright
+from runtime.metrics import span
+from .base import BaseSearch
+from .readiness import ReadinessSpec
+from .parser import Field, SelectorSpec
+
+class QuarkSearch(BaseSearch):
+    name = "quark"
+    base_url_env = "QUARK_BASE_URL"
+    default_base_url = "https://ai.quark.cn"
+    readiness = ReadinessSpec(selector="section.sc.sc_structure_template_normal")
+    # 结果由前端脚本渲染，即使全局拦截了脚本也要放行
+    resource_overrides = {"allow_types": ("script", "xhr", "fetch")}
+    result_spec = SelectorSpec(
+        container="section.sc.sc_structure_template_normal",
+        fields={
+            "title": Field("div.qk-title-text"),
+            "url": Field("a.qk-link-wrapper", attr="href"),
+            "summary": Field("div.qk-paragraph-text"),
+            # 来源与发布时间共用同一个 class：第一个是发布者，有两个时第二个是时间
+            "sources": Field("span.qk-source-item.qk-clamp-1", many=True),
+        },
+        required=(),
+    )
 
     async def run(self, browser: BrowserPlaywright, question: Optional[str]):
-        context = await browser.browser.new_context()
-        page = await context.new_page()
-        await page.goto(self.base_url)
-
-        await page.fill('textarea[placeholder="搜资料、提问题、找答案"]', question)
-        await page.wait_for_timeout(1000)
-        await page.wait_for_selector("span.input-keywords-highlight", timeout=5000)
-        await page.click("span.input-keywords-highlight")
+        async with browser.get_page(self.name, self.base_url, self.resource_overrides, **self.context_options) as page:
+            with span("engine_navigate", engine=self.name):
+                await page.fill('textarea[placeholder="搜资料、提问题、找答案"]', question)
+                await self.readiness.pre_submit(page)
+                await page.wait_for_selector("span.input-keywords-highlight", timeout=5000)
+                await page.click("span.input-keywords-highlight")
 
 
-        await page.wait_for_selector("section.sc.sc_structure_template_normal")
+            await self.wait_until_ready(page)
 
-        await page.wait_for_function('document.body !== null')
-        await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+            await page.wait_for_function('document.body !== null')
+            await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
 
-        # await page.screenshot(path="quark_weather.png")
+            # await page.screenshot(path="quark_weather.png")
 
 
-        html = await page.content()
-        await page.close()
-        await context.close()
+            html = await page.content()
         return html
 
-    def parsing(self, html):
-        soup = BeautifulSoup(html, "lxml")
-        items = soup.find_all("section", class_="sc sc_structure_template_normal")
-        results = []
-        for item in items:
-            # 提取标题
-            title_tag = item.find("div", class_="qk-title-text")
-            title = title_tag.get_text(strip=True) if title_tag else ""
-
-            # 提取发布者
-            tags = item.find_all("span", class_="qk-source-item qk-clamp-1")
-            publisher = tags[0].get_text(strip=True) if tags else ""
-            if len(tags) == 2:
-                time = tags[1].get_text(strip=True)
-            else:
-                time = ""
-
-            url_tag = item.find("a", class_="qk-link-wrapper")
-            url = url_tag["href"] if url_tag else ""
-
-            summary_tag = item.find("div", class_="qk-paragraph-text")
-            summary = summary_tag.get_text(strip=True) if summary_tag else ""
-
-            # 输出解析后的信息
-            result = {
-                "title": title,
-                "publisher": publisher,
-                "url": url,
-                "summary": summary,
-                "time": time
-            }
-            results.append(result)
-        return results
-
-
-
-
-
+    def postprocess(self, result: dict) -> Optional[dict]:
+        tags = result.pop("sources")
+        result["publisher"] = tags[0] if tags else ""
+        result["time"] = tags[1] if len(tags) == 2 else ""
+        return result
@@ -0,0 +1,82 @@
+import time
+from dataclasses import dataclass
+from typing import Dict
+from playwright.async_api import Page, Error as PlaywrightError
+from runtime.deadline import clamp
+
+
+@dataclass
+class ReadinessSpec:
+    """Declarative description of when a results page is ready to be read.
+
+    Attributes:
+        selector (str): CSS selector of a single search result.
+        min_count (int): Number of results to wait for once the first one is attached.
+        min_count_wait_ms (int): Cap on the `min_count` wait; the page is read as-is after it.
+        network_idle (bool): Additionally wait (best effort) for the network to go idle.
+        deadline_ms (int): Hard deadline for the whole readiness wait.
+        pre_submit_delay_ms (int): Fixed sleep between typing the query and submitting it.
+        settle_ms (int): Fixed sleep after the page is ready.
+
+    The fixed sleeps default to 0 and only apply when configured explicitly.
+    """
+    selector: str
+    min_count: int = 1
+    min_count_wait_ms: int = 1000
+    network_idle: bool = False
+    deadline_ms: int = 15000
+    pre_submit_delay_ms: int = 0
+    settle_ms: int = 0
+
+    async def pre_submit(self, page: Page):
+        if self.pre_submit_delay_ms:
+            await page.wait_for_timeout(self.pre_submit_delay_ms)
+
+
+async def wait_for_ready(page: Page, spec: ReadinessSpec) -> Dict[str, float]:
+    """Return as soon as `spec` is satisfied, with the time (ms) spent in each phase.
+
+    Raises playwright's TimeoutError if no result appears before the deadline. Falling
+    short of `min_count` or of network idle is tolerated: whatever is on the page is used.
+    """
+    start = time.perf_counter()
+    deadline = start + clamp(spec.deadline_ms / 1000)
+    timings = {}
+
+    def remaining_ms() -> float:
+        # playwright 把 timeout=0 当作不限时，这里至少保留 1ms
+        return max(1.0, (deadline - time.perf_counter()) * 1000)
+
+    def mark(phase: str, since: float) -> float:
+        now = time.perf_counter()
+        timings[phase] = (now - since) * 1000
+        return now
+
+    await page.wait_for_selector(spec.selector, timeout=remaining_ms())
+    phase_start = mark("selector", start)
+
+    if spec.min_count > 1:
+        try:
+            await page.wait_for_function(
+                "([selector, count]) => document.querySelectorAll(selector).length >= count",
+                arg=[spec.selector, spec.min_count],
+                # 第一个结果出现后其余结果通常很快渲染，不为凑数等到整个截止时间
+                timeout=min(spec.min_count_wait_ms, remaining_ms()),
+            )
+        except PlaywrightError:
+            pass
+        phase_start = mark("min_count", phase_start)
+
+    if spec.network_idle:
+        try:
+            await page.wait_for_load_state("networkidle", timeout=remaining_ms())
+        except PlaywrightError:
+            pass
+        phase_start = mark("network_idle", phase_start)
+
+    if spec.settle_ms:
+        await page.wait_for_timeout(spec.settle_ms)
+        mark("settle", phase_start)
+
+    mark("total", start)
+    return timings
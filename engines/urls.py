@@ -0,0 +1,32 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 常见的追踪参数，不影响页面内容
+TRACKING_PARAMS = {"spm", "from", "fr", "ref", "source", "share_token", "gclid", "fbclid", "msclkid"}
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so that the same page found through different engines compares equal.
+
+    Lowercases scheme and host, drops `www.`, default ports, fragments, tracking parameters
+    and trailing slashes, and sorts the remaining query parameters. The scheme is kept out
+    of the key so that http/https variants merge.
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/")
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit(("", host, path, urlencode(query), "")).lstrip("/")
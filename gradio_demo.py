@@ -2,13 +2,14 @@ import gradio as gr
 import asyncio
 
 from agent import ToolsGraph
+from engines import search_options_from_env
 from pools import BrowserPool, CrawlerPool
 
 
 async def search_answer(question: str, engine: str):
     browser_pool = BrowserPool(pool_size=1)
     crawler_pool = CrawlerPool(pool_size=1)
-    graph = ToolsGraph(browser_pool, crawler_pool, engine=engine)
+    graph = ToolsGraph(browser_pool, crawler_pool, engine=engine, search_options=search_options_from_env(engine))
     result = await graph.run(question)
     return result
 
@@ -21,7 +22,7 @@ def sync_search_answer(question, engine):
 with gr.Blocks() as demo:
     gr.Markdown("# 🔍 多引擎搜索问答")
     question = gr.Textbox(label="请输入你的问题")
-    engine = gr.Radio(["bing", "quark", "baidu", "sougou"], value="bing", label="选择搜索引擎")
+    engine = gr.Radio(["bing", "quark", "baidu", "sougou", "meta"], value="bing", label="选择搜索引擎")
     output = gr.Textbox(label="答案")
 
     btn = gr.Button("提交查询")
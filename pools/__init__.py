@@ -1,4 +1,7 @@
 from .crawler_pool import CrawlerPool
 from .engine_pool import BrowserPool, BrowserPlaywright
+from .crawl_scheduler import CrawlScheduler, CrawlReport
+from .resource_policy import ResourcePolicy
+from .instance_pool import InstancePool
 
-__all__ = ["CrawlerPool", "BrowserPool", "BrowserPlaywright"]
\ No newline at end of file
+__all__ = ["CrawlerPool", "BrowserPool", "BrowserPlaywright", "CrawlScheduler", "CrawlReport", "ResourcePolicy", "InstancePool"]
\ No newline at end of file
@@ -0,0 +1,236 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+from loguru import logger
+from runtime.deadline import clamp, remaining
+from runtime.metrics import observe
+from .crawler_pool import CrawlerPool
+
+
+@dataclass
+class CrawlReport:
+    url: str
+    domain: str
+    status: str = "pending"  # ok | cached | failed | timeout | cancelled
+    attempts: int = 0
+    wait_ms: float = 0.0
+    crawl_ms: float = 0.0
+    error: Optional[str] = None
+
+
+class DomainStats:
+    """Recent crawl latencies and outcomes of one domain."""
+
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)
+        self.ok = 0
+        self.failed = 0
+        self.ewma: Optional[float] = None
+
+    def record(self, seconds: float, ok: bool):
+        self.latencies.append(seconds)
+        self.ewma = seconds if self.ewma is None else 0.7 * self.ewma + 0.3 * seconds
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "p50_ms": ordered[len(ordered) // 2] * 1000 if ordered else 0.0,
+            "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000 if ordered else 0.0,
+        }
+
+
+class CrawlScheduler:
+    """Spread a URL batch over the pooled crawlers with per-domain limits.
+
+    The first crawler is always checked out; further crawlers are borrowed when the batch
+    is large enough, but only if they are idle right now (no waiting, no launching), and each crawler runs up to `per_crawler` URLs at once. At most
+    `per_domain_limit` URLs of one domain are in flight, and requests to the same domain
+    start at least `domain_interval` seconds apart. Every URL has its own timeout, and
+    failed URLs are retried while the batch's `retry_budget` lasts.
+
+    URLs are started in order of expected latency: URLs reported by `is_cached` first,
+    then domains that have been fast recently, then unknown domains (`is_cached` is called
+    from a worker thread). With a `content_cache`
+    (see caches.ContentCache) cached pages are served without a crawler and successful
+    crawls are stored.
+
+    Latency stats are kept for the `max_domains` most recently crawled domains; `stats()`
+    returns them slowest first.
+    """
+
+    def __init__(
+            self,
+            crawler_pool: CrawlerPool,
+            per_crawler: int = 4,
+            per_domain_limit: int = 2,
+            domain_interval: float = 0.25,
+            url_timeout: float = 15.0,
+            retry_budget: int = 2,
+            is_cached: Optional[Callable[[str], bool]] = None,
+            content_cache=None,
+            max_domains: int = 1000,
+    ):
+        self.crawler_pool = crawler_pool
+        self.per_crawler = per_crawler
+        self.per_domain_limit = per_domain_limit
+        self.domain_interval = domain_interval
+        self.url_timeout = url_timeout
+        self.retry_budget = retry_budget
+        self.content_cache = content_cache
+        if is_cached is None and content_cache is not None:
+            is_cached = content_cache.contains
+        self.is_cached = is_cached
+        self.max_domains = max_domains
+        # 按最近爬取顺序排列，超出 max_domains 时淘汰最久未爬取的域名
+        self.domains: "OrderedDict[str, DomainStats]" = OrderedDict()
+        self._domain_locks: Dict[str, asyncio.Semaphore] = {}
+        self._domain_next_start: Dict[str, float] = {}
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        return (urlsplit(url).hostname or "").lower()
+
+    def expected_latency(self, url: str, cached: bool = False) -> float:
+        if cached:
+            return 0.0
+        stats = self.domains.get(self.domain_of(url))
+        return stats.ewma if stats is not None and stats.ewma is not None else self.url_timeout / 2
+
+    def stats(self, top: Optional[int] = None) -> Dict[str, dict]:
+        """Per-domain outcome counts and latency percentiles, slowest p95 first (the `top` slowest when given)."""
+        summaries = {domain: stats.summary() for domain, stats in self.domains.items()}
+        ordered = sorted(summaries.items(), key=lambda item: item[1]["p95_ms"], reverse=True)
+        return dict(ordered[:top] if top is not None else ordered)
+
+    def _record(self, domain: str, seconds: float, ok: bool):
+        stats = self.domains.pop(domain, None) or DomainStats()
+        stats.record(seconds, ok)
+        self.domains[domain] = stats
+        while len(self.domains) > self.max_domains:
+            evicted, _ = self.domains.popitem(last=False)
+            # 最久未爬取的域名通常没有进行中的请求，一并丢弃其并发锁和间隔记录
+            self._domain_locks.pop(evicted, None)
+            self._domain_next_start.pop(evicted, None)
+
+    async def stream(
+            self,
+            urls: List[str],
+            reports: Optional[List[CrawlReport]] = None,
+            on_done: Optional[Callable[[CrawlReport, Optional[dict]], None]] = None,
+    ) -> AsyncIterator[dict]:
+        """Yield crawled pages as they finish. Closing the generator cancels unfinished URLs.
+
+        A CrawlReport per URL is appended to `reports` when given, and `on_done(report, page)`
+        is called once per URL when it finishes, fails or is cancelled.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+        cached = set()
+        if self.is_cached is not None:
+            # is_cached 可能查询 SQLite，放到线程中批量执行
+            cached = await asyncio.to_thread(lambda: {url for url in urls if self.is_cached(url)})
+        order = sorted(urls, key=lambda url: self.expected_latency(url, url in cached))
+        results: asyncio.Queue = asyncio.Queue()
+        budget = {"retries": self.retry_budget}
+
+        async with AsyncExitStack() as stack:
+            crawlers = [[await stack.enter_async_context(self.crawler_pool.get_crawler()), 0]]
+            # 只借用当前空闲的 crawler：不等待归还，也不为此扩容
+            wanted = -(-len(urls) // self.per_crawler)
+            while len(crawlers) < wanted and self.crawler_pool.idle.qsize() > 0:
+                crawler = await stack.enter_async_context(self.crawler_pool.try_checkout())
+                if crawler is None:
+                    break
+                crawlers.append([crawler, 0])
+            slots = asyncio.Semaphore(len(crawlers) * self.per_crawler)
+
+            started = time.perf_counter()
+            tasks = {}
+            for url in order:
+                report = CrawlReport(url=url, domain=self.domain_of(url))
+                if reports is not None:
+                    reports.append(report)
+                tasks[url] = asyncio.create_task(self._crawl(report, crawlers, slots, budget, started, results, on_done))
+            try:
+                for _ in range(len(tasks)):
+                    page = await results.get()
+                    if page is not None:
+                        yield page
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _crawl(
+            self,
+            report: CrawlReport,
+            crawlers: list,
+            slots: asyncio.Semaphore,
+            budget: dict,
+            started: float,
+            results: asyncio.Queue,
+            on_done: Optional[Callable[[CrawlReport, Optional[dict]], None]] = None,
+    ):
+        page = None
+        try:
+            if self.content_cache is not None:
+                page = await self.content_cache.get(report.url)
+                if page is not None:
+                    report.status = "cached"
+                    return
+            domain_lock = self._domain_locks.setdefault(report.domain, asyncio.Semaphore(self.per_domain_limit))
+            async with domain_lock, slots:
+                report.wait_ms = (time.perf_counter() - started) * 1000
+                while True:
+                    report.attempts += 1
+                    await self._polite_wait(report.domain)
+                    entry = min(crawlers, key=lambda c: c[1])
+                    entry[1] += 1
+                    attempt_start = time.perf_counter()
+                    timeout = clamp(self.url_timeout)
+                    try:
+                        page = await asyncio.wait_for(entry[0].run_one(report.url), timeout)
+                        report.status = "ok" if page else "failed"
+                    except asyncio.TimeoutError:
+                        report.status, report.error = "timeout", f"no response within {timeout:.1f}s"
+                    except Exception as e:
+                        report.status, report.error = "failed", repr(e)
+                    finally:
+                        entry[1] -= 1
+                        elapsed = time.perf_counter() - attempt_start
+                        report.crawl_ms += elapsed * 1000
+                    self._record(report.domain, elapsed, report.status == "ok")
+                    observe("crawl_url", elapsed, status=report.status)
+                    if report.status == "ok" and self.content_cache is not None:
+                        await self.content_cache.set(report.url, page)
+                    # 请求截止时间已过时不再重试
+                    if report.status == "ok" or budget["retries"] <= 0 or remaining(1.0) <= 0:
+                        break
+                    budget["retries"] -= 1
+        except asyncio.CancelledError:
+            report.status = "cancelled"
+            raise
+        finally:
+            logger.debug(f"crawl {report.status} {report.url} attempts={report.attempts} wait={report.wait_ms:.0f}ms crawl={report.crawl_ms:.0f}ms")
+            results.put_nowait(page)
+            if on_done is not None:
+                on_done(report, page)
+
+    async def _polite_wait(self, domain: str):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start_at = max(now, self._domain_next_start.get(domain, now))
+        self._domain_next_start[domain] = start_at + self.domain_interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
@@ -1,64 +1,67 @@
-import asyncio
-import atexit
-from asyncio import Queue, Semaphore
-from contextlib import asynccontextmanager
+from typing import Optional
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
+from .instance_pool import InstancePool, process_tree_rss
+from .resource_policy import ResourcePolicy
 
 
 class CrawlerInstance:
-    def __init__(self):
+    def __init__(self, resource_policy: Optional[ResourcePolicy] = None):
         self.browser_config = BrowserConfig(headless=True, verbose=False)
         self.run_config = CrawlerRunConfig(cache_mode=CacheMode.ENABLED, stream=False)
+        self.resource_policy = resource_policy
         self.crawler = None
 
     async def __aenter__(self):
         self.crawler = AsyncWebCrawler(config=self.browser_config)
+        if self.resource_policy is not None:
+            # crawl4ai 为每次抓取创建页面后调用该钩子，在页面上注册拦截路由
+            self.crawler.crawler_strategy.set_hook("on_page_context_created", self._apply_policy)
         return self
 
+    async def _apply_policy(self, page, context=None, **kwargs):
+        await self.resource_policy.apply(page, target="crawler")
+        return page
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.crawler:
-            await self.crawler.close()
-
-    async def run(self, urls: list[str]) -> list[dict]:
-        responses = await self.crawler.arun_many(urls=urls, config=self.run_config)
-
-        results = []
-        for r in responses:
-            if r.success:
-                results.append({"url": r.url, "content": r.markdown})
-        return results
-
-class CrawlerPool:
-    def __init__(self, pool_size):
-        self.pool_size = pool_size
-        self.pool = Queue(maxsize=pool_size)
-        self.lock = Semaphore(pool_size)
-        self.instances = []
-        atexit.register(lambda: asyncio.run(self.cleanup()))
-
-    @asynccontextmanager
-    async def get_crawler(self):
-        async with self.lock:
-            crawler = await self._get_instance()
-            try:
-                yield crawler
-            finally:
-                await self._release_instance(crawler)
-
-    async def _get_instance(self):
-        if self.pool.empty():
-            crawler = await CrawlerInstance().__aenter__()
-            self.instances.append(crawler)
-        else:
-            crawler = await self.pool.get()
-        return crawler
-
-    async def _release_instance(self, crawler: CrawlerInstance):
-        if self.pool.qsize() < self.pool_size:
-            await self.pool.put(crawler)
-
-    async def cleanup(self):
-        await asyncio.gather(*[
-            crawler.__aexit__(None, None, None)
-            for crawler in self.instances
-        ])
+        crawler, self.crawler = self.crawler, None
+        if crawler:
+            await crawler.close()
+
+    def _browser_manager(self):
+        strategy = getattr(self.crawler, "crawler_strategy", None)
+        return getattr(strategy, "browser_manager", None)
+
+    def healthy(self) -> bool:
+        if self.crawler is None:
+            return False
+        # crawl4ai 在第一次抓取时才启动浏览器，尚未启动也算健康
+        browser = getattr(self._browser_manager(), "browser", None)
+        return browser is None or browser.is_connected()
+
+    def rss(self) -> Optional[int]:
+        return process_tree_rss(getattr(self._browser_manager(), "playwright", None))
+
+    async def run_one(self, url: str) -> Optional[dict]:
+        r = await self.crawler.arun(url=url, config=self.run_config)
+        if r.success:
+            return {"url": r.url, "content": r.markdown}
+        return None
+
+
+class CrawlerPool(InstancePool):
+    """Autoscaling pool of CrawlerInstance; see InstancePool for the sizing knobs."""
+
+    name = "crawler"
+
+    def __init__(self, pool_size, resource_policy: Optional[ResourcePolicy] = None, **scaling):
+        super().__init__(pool_size, **scaling)
+        self.resource_policy = resource_policy
+
+    def get_crawler(self):
+        return self.checkout()
+
+    def resource_stats(self) -> dict:
+        return self.resource_policy.stats.snapshot() if self.resource_policy is not None else {}
+
+    async def _new_instance(self):
+        return await CrawlerInstance(self.resource_policy).__aenter__()
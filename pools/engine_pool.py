@@ -1,14 +1,45 @@
 from contextlib import asynccontextmanager
-from asyncio import Queue, Semaphore
+from asyncio import Queue, QueueEmpty
+from typing import Dict, List, Optional
 from playwright.async_api import async_playwright
-import atexit
 import asyncio
+from runtime.metrics import observe, span
+from .instance_pool import InstancePool, PooledInstance, process_tree_rss
+from .resource_policy import ResourcePolicy
+
+
+class WarmPage:
+    """A pre-created context/page pair kept warm between uses."""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    async def close(self):
+        try:
+            await self.page.close()
+            await self.context.close()
+        except Exception:
+            pass
+
 
 class BrowserPlaywright:
-    def __init__(self, headless):
+    def __init__(self, headless, warm_pages: int = 2, max_page_uses: int = 20, resource_policy: Optional[ResourcePolicy] = None):
         self.playwright = None
         self.browser = None
         self.headless = headless
+        # 每个引擎一个预热页面队列
+        self.warm_pages = warm_pages
+        self.max_page_uses = max_page_uses
+        self.page_pools: Dict[str, Queue] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self._reset_tasks = set()
+        # 新建的上下文按该策略拦截图片、字体、统计脚本等请求；各引擎可在此基础上覆盖
+        self.resource_policy = resource_policy
+        self._policies: Dict[str, ResourcePolicy] = {}
 
     async def __aenter__(self):
         # 启动 Playwright 只需启动一次
@@ -20,63 +51,163 @@ class BrowserPlaywright:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        for task in list(self._reset_tasks):
+            task.cancel()
+        self.page_pools.clear()
         # Only close the browser when we're done with all tasks
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
+        browser, playwright = self.browser, self.playwright
+        self.browser = self.playwright = None
+        if browser:
+            await browser.close()
+        if playwright:
+            await playwright.stop()
+
+    def healthy(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    def rss(self) -> Optional[int]:
+        return process_tree_rss(self.playwright)
 
     async def new_page(self):
         # 创建新页面
         context = await self.browser.new_context()
+        if self.resource_policy is not None:
+            await self.resource_policy.apply(context)
         return await context.new_page()
 
-
-class BrowserPool:
-    def __init__(self, pool_size: int):
-        self.pool_size = pool_size
-        self.pool = Queue(maxsize=pool_size)  # 设置队列的最大长度为 pool_size
-        self.lock = Semaphore(pool_size)  # 控制并发
-        self.browser_instances = []  # 用来保存浏览器实例
-        # 注册退出时清理资源的函数
-        atexit.register(lambda: asyncio.run(self.cleanup()))
+    def policy_for(self, key: str, overrides: Optional[dict] = None) -> Optional[ResourcePolicy]:
+        if self.resource_policy is None or not overrides:
+            return self.resource_policy
+        policy = self._policies.get(key)
+        if policy is None:
+            policy = self._policies[key] = self.resource_policy.override(**overrides)
+        return policy
 
     @asynccontextmanager
-    async def get_browser(self):
-        async with self.lock:
-            browser_instance = await self._get_browser_instance()
+    async def get_page(self, key: str, url: Optional[str] = None, resource_overrides: Optional[dict] = None, **context_options):
+        """Check out a warm page for `key` (usually the engine name), already navigated to `url`.
+
+        On a clean exit the page is navigated back to `url` in the background and returned
+        to the pool; it is closed instead after `max_page_uses` uses or if the caller raised.
+        New contexts get the pool's resource policy with `resource_overrides` applied.
+        """
+        pool = self.page_pools.setdefault(key, Queue(maxsize=self.warm_pages))
+        try:
+            warm = pool.get_nowait()
+            self.hits += 1
+            observe("page_setup", 0.0, engine=key, warm="hit")
+        except QueueEmpty:
+            self.misses += 1
+            with span("page_setup", engine=key, warm="miss"):
+                warm = await self._create_warm_page(url, context_options, self.policy_for(key, resource_overrides))
+
+        ok = False
+        try:
+            yield warm.page
+            ok = True
+        finally:
+            warm.uses += 1
+            if ok and warm.uses < self.max_page_uses and not pool.full():
+                task = asyncio.create_task(self._reset_page(pool, warm, url))
+                self._reset_tasks.add(task)
+                task.add_done_callback(self._reset_tasks.discard)
+            else:
+                self.recycled += 1
+                await warm.close()
+
+    async def prewarm(
+            self,
+            key: str,
+            url: Optional[str] = None,
+            count: Optional[int] = None,
+            resource_overrides: Optional[dict] = None,
+            **context_options,
+    ):
+        pool = self.page_pools.setdefault(key, Queue(maxsize=self.warm_pages))
+        count = self.warm_pages if count is None else count
+        policy = self.policy_for(key, resource_overrides)
+        while pool.qsize() < min(count, self.warm_pages):
+            pool.put_nowait(await self._create_warm_page(url, context_options, policy))
+
+    async def _create_warm_page(self, url: Optional[str], context_options: dict, policy: Optional[ResourcePolicy] = None) -> WarmPage:
+        context = await self.browser.new_context(**context_options)
+        if policy is not None:
+            # 路由在上下文上注册一次，预热页面复用时无需重复设置
+            await policy.apply(context)
+        warm = WarmPage(context, await context.new_page())
+        if url:
             try:
-                yield browser_instance
-            finally:
-                await self._release_browser_instance(browser_instance)
-
-    async def _get_browser_instance(self):
-        # 如果池为空，创建新实例
-        if self.pool.empty():
-            browser_instance = await self._create_browser_instance()
-        else:
-            browser_instance = await self.pool.get()
-        return browser_instance
-
-    async def _create_browser_instance(self, headless=True):
+                await warm.page.goto(url)
+            except BaseException:
+                await warm.close()
+                raise
+        return warm
+
+    async def _reset_page(self, pool: Queue, warm: WarmPage, url: Optional[str]):
+        # 回到首页，下次取出时即可直接输入
+        try:
+            if url:
+                await warm.page.goto(url)
+            pool.put_nowait(warm)
+        except Exception:
+            self.recycled += 1
+            await warm.close()
+
+
+class BrowserPool(InstancePool):
+    """Autoscaling pool of BrowserPlaywright instances; see InstancePool for the sizing knobs."""
+
+    name = "browser"
+
+    def __init__(
+            self,
+            pool_size: int,
+            warm_pages: int = 2,
+            max_page_uses: int = 20,
+            resource_policy: Optional[ResourcePolicy] = None,
+            **scaling,
+    ):
+        super().__init__(pool_size, **scaling)
+        self.warm_pages = warm_pages
+        self.max_page_uses = max_page_uses
+        self.resource_policy = resource_policy
+        # 已关闭浏览器的页面统计，保证 page_stats 单调递增
+        self._retired_pages = {"hits": 0, "misses": 0, "recycled": 0}
+
+    @property
+    def browser_instances(self) -> List[BrowserPlaywright]:
+        return self.instances
+
+    def get_browser(self):
+        return self.checkout()
+
+    async def _new_instance(self):
         # 创建一个新的浏览器实例并返回
-        browser_instance = await BrowserPlaywright(headless).__aenter__()
-        self.browser_instances.append(browser_instance)  # 保存实例
-        return browser_instance
-
-    async def _release_browser_instance(self, browser_instance: BrowserPlaywright):
-        if self.pool.qsize() < self.pool_size:
-            await self.pool.put(browser_instance)
-
-    async def cleanup(self):
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        print("Cleaning up all browser instances.")
-
-        # 并发清理所有实例
-        await asyncio.gather(
-            *(browser.__aexit__(None, None, None) for browser in self.browser_instances)
-        )
+        browser_instance = BrowserPlaywright(True, self.warm_pages, self.max_page_uses, self.resource_policy)
+        try:
+            return await browser_instance.__aenter__()
+        except BaseException:
+            # 启动失败时也要停掉已启动的 Playwright 驱动
+            await browser_instance.__aexit__(None, None, None)
+            raise
+
+    async def _close(self, slot: PooledInstance):
+        browser = slot.instance
+        for key in self._retired_pages:
+            self._retired_pages[key] += getattr(browser, key)
+        await super()._close(slot)
+
+    def page_stats(self) -> dict:
+        browsers = self.browser_instances
+        hits = self._retired_pages["hits"] + sum(b.hits for b in browsers)
+        misses = self._retired_pages["misses"] + sum(b.misses for b in browsers)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "recycled": self._retired_pages["recycled"] + sum(b.recycled for b in browsers),
+            "warm": sum(q.qsize() for b in browsers for q in b.page_pools.values()),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def resource_stats(self) -> dict:
+        return self.resource_policy.stats.snapshot() if self.resource_policy is not None else {}
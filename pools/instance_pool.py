@@ -0,0 +1,352 @@
+"""
+Autoscaling pool of long-lived browser-like instances, the base of BrowserPool and CrawlerPool.
+
+    async with pool.checkout() as instance:
+        ...
+
+The pool keeps between `min_size` and `max_size` instances. A checkout reuses an idle
+instance when there is one, otherwise it waits up to `scale_up_after` seconds for one to be
+returned before launching another (launching Chromium costs far more than a short wait).
+Instances idle for `idle_timeout` seconds are closed down to `min_size`. An instance is
+retired after `max_uses` checkouts or once its process tree grows past `max_rss_mb`, and is
+health-checked before being handed out. RSS is sampled by the background task at most
+every `rss_interval` seconds per instance, in a worker thread; checkouts only read the
+cached value, so walking Chromium's process tree never blocks the event loop. Every
+instance the pool creates stays tracked until it is closed, so `cleanup()` closes
+everything, including instances still checked out.
+
+Subclasses implement `_new_instance()`; instances provide `__aenter__`/`__aexit__`,
+`healthy()` and `rss()` (bytes, or None when unknown).
+"""
+import asyncio
+import atexit
+import time
+from abc import ABC, abstractmethod
+from asyncio import LifoQueue, QueueEmpty, Semaphore
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from loguru import logger
+from runtime.metrics import REGISTRY, observe
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "pool_wait_seconds",
+    "Time a checkout waited for a pooled browser or crawler, including launching one.",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+POOL_CREATED = REGISTRY.counter("pool_created_total", "Pooled instances launched, by pool and cause.")
+POOL_RECYCLED = REGISTRY.counter("pool_recycled_total", "Pooled instances closed, by pool and reason.")
+
+
+def process_tree_rss(playwright) -> Optional[int]:
+    """Summed RSS of a Playwright driver process and the browsers it launched."""
+    # Playwright 没有公开驱动进程的 pid，取不到时返回 None，不做内存回收
+    transport = getattr(getattr(playwright, "_connection", None), "_transport", None)
+    proc = getattr(transport, "_proc", None)
+    if psutil is None or proc is None:
+        return None
+    try:
+        root = psutil.Process(proc.pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+class PooledInstance:
+    """An instance plus the bookkeeping the pool needs to scale and recycle it."""
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.uses = 0
+        # 后台任务定期采样的 RSS（字节），未采样或取不到时为 None
+        self.rss: Optional[int] = None
+        self.rss_at = 0.0
+
+
+class InstancePool(ABC):
+    name = "instance"
+
+    def __init__(
+            self,
+            max_size: int,
+            min_size: int = 1,
+            idle_timeout: float = 300.0,
+            max_uses: int = 0,
+            max_rss_mb: float = 0,
+            scale_up_after: float = 0.1,
+            rss_interval: float = 10.0,
+    ):
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.idle_timeout = idle_timeout
+        # 0 表示不限制
+        self.max_uses = max_uses
+        self.max_rss = max_rss_mb * 2 ** 20
+        self.scale_up_after = scale_up_after
+        self.rss_interval = rss_interval
+        self.idle = LifoQueue()  # 后进先出：负载低时总复用同一个实例，其余的空闲超时后关闭
+        self.lock = Semaphore(self.max_size)  # 同时借出的实例不超过 max_size
+        self.slots: List[PooledInstance] = []  # 所有未关闭的实例，包括借出中的
+        self.in_use = 0
+        self.waiting = 0
+        self.creating = 0
+        self.created = 0
+        self.recycled = {}
+        self.closed = False
+        self._reaper: Optional[asyncio.Task] = None
+        # 注册退出时清理资源的函数；lifespan 中已清理时不再重复
+        atexit.register(self._cleanup_at_exit)
+
+    @property
+    def pool_size(self) -> int:
+        return self.max_size
+
+    @property
+    def instances(self) -> list:
+        return [slot.instance for slot in self.slots]
+
+    @abstractmethod
+    async def _new_instance(self):
+        pass
+
+    async def start(self):
+        """Launch `min_size` instances now and start idle eviction and RSS sampling."""
+        self._start_reaper()
+        missing = self.min_size - len(self.slots) - self.creating
+        slots = await asyncio.gather(*(self._spawn("min") for _ in range(max(0, missing))))
+        for slot in slots:
+            self.idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def checkout(self):
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.lock.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            self._start_reaper()
+            slot = await self._acquire()
+            wait = time.perf_counter() - start
+            POOL_WAIT_SECONDS.observe(wait, pool=self.name)
+            observe(f"{self.name}_checkout", wait)
+            self.in_use += 1
+            try:
+                yield slot.instance
+            finally:
+                self.in_use -= 1
+                await self._release(slot)
+        finally:
+            self.lock.release()
+
+    @asynccontextmanager
+    async def try_checkout(self):
+        """Like `checkout()`, but yields None instead of waiting or launching when nothing is idle."""
+        if self.lock.locked() or self.idle.empty():
+            yield None
+            return
+        # 未满时 acquire 立即返回
+        await self.lock.acquire()
+        try:
+            slot = None
+            while slot is None and not self.idle.empty():
+                slot = self.idle.get_nowait()
+                if not slot.instance.healthy():
+                    await self._retire(slot, "unhealthy")
+                    slot = None
+                elif self._over_memory(slot):
+                    await self._retire(slot, "memory")
+                    slot = None
+            if slot is None:
+                yield None
+                return
+            POOL_WAIT_SECONDS.observe(0.0, pool=self.name)
+            self.in_use += 1
+            try:
+                yield slot.instance
+            finally:
+                self.in_use -= 1
+                await self._release(slot)
+        finally:
+            self.lock.release()
+
+    async def _acquire(self) -> PooledInstance:
+        deadline = time.perf_counter() + self.scale_up_after
+        while True:
+            try:
+                slot = self.idle.get_nowait()
+            except QueueEmpty:
+                total = len(self.slots) + self.creating
+                if total < max(self.min_size, 1):
+                    return await self._spawn("min")
+                if total < self.max_size and time.perf_counter() >= deadline:
+                    # 等待超过 scale_up_after 仍没有实例归还，扩容
+                    return await self._spawn("scale_up")
+                # 已达上限时等待归还；未达上限时等到扩容时刻
+                timeout = self.scale_up_after if total >= self.max_size else deadline - time.perf_counter()
+                try:
+                    slot = await asyncio.wait_for(self.idle.get(), max(0.0, timeout))
+                except asyncio.TimeoutError:
+                    continue
+            if not slot.instance.healthy():
+                await self._retire(slot, "unhealthy")
+            elif self._over_memory(slot):
+                await self._retire(slot, "memory")
+            else:
+                return slot
+
+    async def _spawn(self, cause: str) -> PooledInstance:
+        self.creating += 1
+        try:
+            instance = await self._new_instance()
+        finally:
+            self.creating -= 1
+        slot = PooledInstance(instance)
+        if self.closed:
+            # 创建期间池已被清理，新实例不再交出
+            await self._close(slot)
+            raise RuntimeError(f"{self.name} pool is closed")
+        self.slots.append(slot)
+        self.created += 1
+        POOL_CREATED.inc(pool=self.name, cause=cause)
+        return slot
+
+    async def _release(self, slot: PooledInstance):
+        slot.uses += 1
+        slot.last_used = time.monotonic()
+        reason = self._retire_reason(slot)
+        if reason:
+            await self._retire(slot, reason)
+        elif slot in self.slots:
+            self.idle.put_nowait(slot)
+
+    def _retire_reason(self, slot: PooledInstance) -> Optional[str]:
+        if self.closed:
+            return "closed"
+        if self.max_uses and slot.uses >= self.max_uses:
+            return "uses"
+        if self._over_memory(slot):
+            return "memory"
+        return None
+
+    def _over_memory(self, slot: PooledInstance) -> bool:
+        if not self.max_rss or slot.rss is None or slot.rss <= self.max_rss:
+            return False
+        logger.info(f"{self.name} instance uses {slot.rss / 2 ** 20:.0f}MB after {slot.uses} uses, recycling")
+        return True
+
+    async def _retire(self, slot: PooledInstance, reason: str):
+        if slot not in self.slots:
+            return
+        self.slots.remove(slot)
+        self.recycled[reason] = self.recycled.get(reason, 0) + 1
+        POOL_RECYCLED.inc(pool=self.name, reason=reason)
+        await self._close(slot)
+
+    async def _close(self, slot: PooledInstance):
+        try:
+            await slot.instance.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Failed to close {self.name} instance: {e!r}")
+
+    def _start_reaper(self):
+        if self._reaper is None and (self.idle_timeout > 0 or self.max_rss):
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def _reap(self):
+        intervals = []
+        if self.idle_timeout > 0:
+            intervals.append(min(30.0, self.idle_timeout / 2))
+        if self.max_rss:
+            intervals.append(self.rss_interval)
+        interval = max(0.01, min(intervals))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.max_rss:
+                    await self.sample_rss()
+                if self.idle_timeout > 0:
+                    await self.evict_idle()
+            except Exception as e:
+                logger.warning(f"{self.name} pool maintenance failed: {e!r}")
+
+    async def sample_rss(self, now: Optional[float] = None):
+        """Refresh the cached RSS of instances not sampled in the last `rss_interval` seconds."""
+        now = time.monotonic() if now is None else now
+        slots = [slot for slot in self.slots if now - slot.rss_at >= self.rss_interval]
+        if not slots:
+            return
+        # psutil 遍历进程树放到线程中，不阻塞事件循环
+        values = await asyncio.to_thread(lambda: [slot.instance.rss() for slot in slots])
+        for slot, rss in zip(slots, values):
+            slot.rss, slot.rss_at = rss, now
+
+    async def evict_idle(self, now: Optional[float] = None):
+        """Close instances idle for longer than `idle_timeout`, keeping at least `min_size`."""
+        now = time.monotonic() if now is None else now
+        idle = []
+        while not self.idle.empty():
+            idle.append(self.idle.get_nowait())
+        keep, expired = [], []
+        # 先取出的是最近用过的，超时的都在后面
+        for slot in idle:
+            if now - slot.last_used >= self.idle_timeout and len(self.slots) - len(expired) > self.min_size:
+                expired.append(slot)
+            else:
+                keep.append(slot)
+        for slot in reversed(keep):
+            self.idle.put_nowait(slot)
+        for slot in expired:
+            await self._retire(slot, "idle")
+
+    def utilization(self) -> dict:
+        return {
+            "size": self.max_size,
+            "min": self.min_size,
+            "instances": len(self.slots),
+            "in_use": self.in_use,
+            "idle": self.idle.qsize(),
+            "waiting": self.waiting,
+            "creating": self.creating,
+        }
+
+    def recycle_stats(self) -> dict:
+        return {"created": self.created, **self.recycled}
+
+    def _cleanup_at_exit(self):
+        if self.slots:
+            asyncio.run(self.cleanup())
+
+    async def cleanup(self):
+        """Close every instance this pool has created. Safe to call more than once."""
+        self.closed = True
+        reaper, self._reaper = self._reaper, None
+        if reaper is not None and not reaper.done():
+            try:
+                reaper.cancel()
+            except RuntimeError:
+                # atexit 时原事件循环已关闭
+                pass
+        slots, self.slots = self.slots, []
+        while not self.idle.empty():
+            self.idle.get_nowait()
+        if not slots:
+            return
+
+        print(f"Cleaning up {len(slots)} {self.name} instances.")
+        # 并发清理所有实例，单个失败不影响其它实例
+        await asyncio.gather(*(self._close(slot) for slot in slots))
@@ -1,4 +1,5 @@
-from .chunker import MarkdownSplitter, Chunker
+from .chunker import MarkdownSplitter, Chunker, SpanChunker, chunk_text
 from .base import OpenAIEmbeddingReranker
+from .lexical import BM25Reranker, HybridReranker
 
-__all__ = ["MarkdownSplitter", "OpenAIEmbeddingReranker", "Chunker"]
\ No newline at end of file
+__all__ = ["MarkdownSplitter", "OpenAIEmbeddingReranker", "Chunker", "SpanChunker", "chunk_text", "BM25Reranker", "HybridReranker"]
\ No newline at end of file
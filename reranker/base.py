@@ -1,30 +1,65 @@
+import asyncio
+import weakref
 from abc import ABC, abstractmethod
 from typing import List, Dict, Union, Optional
 from openai import AsyncOpenAI
-import torch
+import numpy as np
 import os
 from dotenv import load_dotenv
+from caches.embedding_cache import EmbeddingCache
+from runtime.metrics import span
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def score_matrix(query_embeddings: np.ndarray, doc_embeddings: np.ndarray, backend: str = "numpy") -> np.ndarray:
+    """Cosine similarity of every query against every document, shape (queries, documents)."""
+    queries = normalize_rows(query_embeddings)
+    documents = normalize_rows(doc_embeddings)
+    if backend == "torch":
+        import torch  # 仅在显式选择 torch 后端时加载
+        return (torch.from_numpy(queries) @ torch.from_numpy(documents).T).numpy()
+    return queries @ documents.T
+
+
+def top_k_indices(scores: np.ndarray, k: int, backend: str = "numpy") -> np.ndarray:
+    """Indices of the `k` best scores along the last axis, best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.zeros(scores.shape[:-1] + (0,), dtype=np.int64)
+    if backend == "torch":
+        import torch
+        return torch.topk(torch.from_numpy(scores), k, dim=-1).indices.numpy()
+    if k < scores.shape[-1]:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), scores.shape[:-1] + (k,))
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
 
 
 class BaseSemanticSearcher(ABC):
     """
-    Abstract base class for semantic search implementations.
+    Abstract base class for rerankers.
+
+    Subclasses implement `calculate_scores`, a (queries, documents) score matrix; ranking
+    and grouping are shared. Set `backend = "torch"` to run top-k with torch instead of
+    NumPy; torch is only imported when that backend is selected.
     """
 
-    @abstractmethod
-    def _get_embeddings(self, texts: List[str]) -> torch.Tensor:
-        pass
+    backend: str = "numpy"
 
+    @abstractmethod
     async def calculate_scores(
         self,
         queries: List[str],
         documents: List[str],
-    ) -> torch.Tensor:
-        query_embeddings = await self._get_embeddings(queries)
-        doc_embeddings = await self._get_embeddings(documents)
-        scores = query_embeddings @ doc_embeddings.T
-        scores = torch.softmax(scores, dim=-1)
-        return scores
+    ) -> np.ndarray:
+        pass
 
     async def rerank(
         self,
@@ -34,16 +69,17 @@ class BaseSemanticSearcher(ABC):
     ) -> List[Dict[str, Union[str, float]]]:
         queries = [query] if isinstance(query, str) else query
         scores = await self.calculate_scores(queries, documents)
+        # 多个 query 共用一次矩阵乘法和一次 top-k
+        indices = top_k_indices(scores, top_k, self.backend)
 
         results = []
-        for query_scores in scores:
-            top_indices = torch.topk(query_scores, min(top_k, len(documents)), dim=0)
+        for query_scores, query_indices in zip(scores, indices):
             query_results = [
                 {
-                    "document": documents[idx.item()],
-                    "score": score.item()
+                    "document": documents[idx],
+                    "score": score
                 }
-                for score, idx in zip(top_indices.values, top_indices.indices)
+                for idx, score in zip(query_indices.tolist(), query_scores[query_indices].tolist())
             ]
             results.append(query_results)
 
@@ -60,9 +96,63 @@ class BaseSemanticSearcher(ABC):
             return [x['document'].strip() for x in results]
         return [[x['document'].strip() for x in r] for r in results]
 
+    async def get_reranked_groups(
+        self,
+        query: str,
+        groups: List[List[str]],
+        top_k: int = 5
+    ) -> List[List[str]]:
+        """Rerank several document groups (e.g. the chunks of each page) against one query.
+
+        The query is embedded once and all documents are embedded together, so the whole
+        batch costs one scoring pass; the top `top_k` documents are then picked per group.
+        """
+        documents = [doc for group in groups for doc in group]
+        if not documents:
+            return [[] for _ in groups]
+        scores = (await self.calculate_scores([query], documents))[0]
+
+        results = []
+        start = 0
+        for group in groups:
+            end = start + len(group)
+            top_indices = top_k_indices(scores[start:end], top_k, self.backend)
+            results.append([group[idx].strip() for idx in top_indices.tolist()])
+            start = end
+        return results
+
 
-class OpenAIEmbeddingReranker(BaseSemanticSearcher):
-    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, model: Optional[str] = None):
+class EmbeddingSemanticSearcher(BaseSemanticSearcher):
+    """Scores documents by cosine similarity of L2-normalized float32 embeddings."""
+
+    @abstractmethod
+    async def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        pass
+
+    async def calculate_scores(
+        self,
+        queries: List[str],
+        documents: List[str],
+    ) -> np.ndarray:
+        query_embeddings, doc_embeddings = await asyncio.gather(
+            self._get_embeddings(queries),
+            self._get_embeddings(documents),
+        )
+        # softmax 不改变排序，直接返回余弦相似度
+        return score_matrix(query_embeddings, doc_embeddings, self.backend)
+
+
+class OpenAIEmbeddingReranker(EmbeddingSemanticSearcher):
+    def __init__(
+            self,
+            base_url: Optional[str] = None,
+            api_key: Optional[str] = None,
+            model: Optional[str] = None,
+            cache: Optional[EmbeddingCache] = None,
+            max_batch_size: int = 256,
+            max_concurrency: int = 4,
+            backend: str = "numpy",
+    ):
         load_dotenv()
         self.api_key = api_key or os.getenv("EMBEDDING_API_KEY")
         self.base_url = base_url or os.getenv("EMBEDDING_BASE_URL")
@@ -70,13 +160,49 @@ class OpenAIEmbeddingReranker(BaseSemanticSearcher):
         if not self.api_key:
             raise ValueError("No OpenAI API key provided")
         self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
-        self.model = model
+        # 按 hash(model, text) 缓存向量，只把未命中的文本发给接口
+        self.cache = cache
+        # 单次请求的最大条数由服务商决定，超出部分拆批并发请求
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self._semaphores = weakref.WeakKeyDictionary()
+        self.backend = backend
 
-    async def _get_embeddings(self, texts: List[str]) -> torch.Tensor:
-        response = await self.client.embeddings.create(
-            model=self.model,
-            input=texts
-        )
-        embeddings = [e.embedding for e in response.data]
-        return torch.tensor(embeddings)
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 每个事件循环一个信号量：gradio 每次点击都在新的 asyncio.run 中执行，信号量不能跨循环复用
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        if self.cache is None:
+            return await self._embed(texts)
+
+        # SQLite 查询和写锁等待放到线程中，不阻塞事件循环
+        cached = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            fresh = await self._embed(missing)
+            await asyncio.to_thread(self.cache.put_many, self.model, missing, fresh)
+            fresh_by_text = dict(zip(missing, fresh))
+            cached = [fresh_by_text[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        return np.stack(cached)
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        batches = [texts[i:i + self.max_batch_size] for i in range(0, len(texts), self.max_batch_size)]
+        with span("embed"):
+            embeddings = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        return np.concatenate(embeddings)
+
+    async def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        async with self.semaphore:
+            response = await self.client.embeddings.create(
+                model=self.model,
+                input=texts
+            )
+        data = sorted(response.data, key=lambda e: e.index)
+        return np.asarray([e.embedding for e in data], dtype=np.float32)
 
@@ -1,5 +1,18 @@
+import os
+import re
 from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
+
+# 每次匹配一个句子：到空行、换行或中英文句末标点（含其后的引号括号）为止；“3.14”这类不后接空白的点不算句末
+SEGMENT = re.compile(
+    r"(?:[^\n。！？!?；;….]+|\.(?!\s))*"
+    r"(?:\n[ \t]*\n\s*|\n|[。！？!?；;…]+[”’」』）)\]]*|\.(?=\s)|\Z)"
+)
+# 一行（连同其后的换行和空行）
+LINE = re.compile(r"[^\n]+\n*|\n+")
+# 与 agent/compaction.py 的估计一致：中日韩字符约 1 token/字，其余约 4 字符/token
+LATIN_CHARS_PER_TOKEN = 4
+
 
 class MarkdownSplitter:
     def __init__(self, markdown_text: str, chunk_size: int = 150, chunk_overlap: int = 50):
@@ -106,6 +119,190 @@ class Chunker:
         return [self.split_text(text) for text in texts]
 
 
+class SpanChunker:
+    """Single-pass, CJK-aware chunker that works on (start, end) offsets.
+
+    The text is walked once, line by line. Lines are packed greedily up to `chunk_size`;
+    only a line too long to fit is broken at Chinese and Latin sentence ends, and a
+    sentence still longer than `chunk_size` is cut by length. A markdown heading starts a
+    new chunk once the current one is a quarter full. Consecutive chunks share up to
+    `chunk_overlap` worth of trailing sentences, never across a heading.
+
+    Sizes are in characters, or with `unit="tokens"` in estimated tokens (one per CJK
+    character, four Latin characters per token), which tracks embedding model limits
+    for Chinese text far better (CJK characters are counted from the UTF-8 length, so
+    other multi-byte characters count as partly CJK). Instances hold no per-text state
+    and can be shared.
+
+    Usage:
+        chunker = SpanChunker(chunk_size=256, chunk_overlap=64, unit="tokens")
+        for start, end in chunker.spans(text):
+            ...
+    """
+
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 128, unit: str = "chars"):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown unit: {unit}")
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.unit = unit
+
+    def cost(self, text: str, start: int, end: int) -> int:
+        if self.unit == "chars":
+            return end - start
+        # 中日韩字符在 UTF-8 中占 3 字节、ASCII 占 1 字节，由编码长度即可估出中日韩字符数，
+        # 比逐段正则匹配快一个数量级
+        cjk = (len(text[start:end].encode("utf-8")) - (end - start)) // 2
+        return cjk + -(-(end - start - cjk) // LATIN_CHARS_PER_TOKEN)
+
+    def segments(self, text: str, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int, int, bool]]:
+        """(start, end, cost, starts_heading) for every sentence in `text[start:end]`."""
+        cost = self.cost
+        segments = []
+        for match in SEGMENT.finditer(text, start, len(text) if end is None else end):
+            s, e = match.span()
+            if s < e:
+                segments.append((s, e, cost(text, s, e), text.startswith("#", s)))
+        return segments
+
+    def units(self, text: str) -> Iterator[Tuple[int, int, int, bool]]:
+        """Lines that fit in a chunk as they are, and the sentences of those that do not."""
+        for match in LINE.finditer(text):
+            start, end = match.span()
+            cost = self.cost(text, start, end)
+            if cost <= self.chunk_size:
+                yield start, end, cost, text.startswith("#", start)
+            else:
+                yield from self.segments(text, start, end)
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """Chunk offsets into `text`, whitespace-trimmed, in order."""
+        if not text:
+            return []
+        chunks = []
+        current = []  # 当前块中的行/句子
+        size = 0
+        overlap = False  # current 中只有上一块的重叠部分和空行
+        for unit in self.units(text):
+            start, end, cost, heading = unit
+            if cost > self.chunk_size:
+                # 没有标点的超长句子按长度硬切，当前块中尚未输出的内容（如标题）并入第一段；
+                # 超长的是标题时先输出当前块，硬切的重叠不跨过标题
+                if heading and current and not overlap:
+                    chunks.append((current[0][0], current[-1][1]))
+                    current = []
+                pending = current[0][0] if current and not overlap else start
+                chunks.extend(self._hard_split(text, pending, end))
+                current, size, overlap = [], 0, False
+                continue
+            if overlap and (heading or size + cost > self.chunk_size):
+                # 重叠之后只隔着空行就遇到标题或放不下：丢弃重叠，不输出只含重叠内容的块
+                current, size = [], 0
+            elif current and (size + cost > self.chunk_size or (heading and size >= self.chunk_size // 4)):
+                chunks.append((current[0][0], current[-1][1]))
+                current = [] if heading else self._overlap(text, current)
+                size = sum(u[2] for u in current)
+                while current and size + cost > self.chunk_size:
+                    size -= current.pop(0)[2]
+                overlap = bool(current)
+            current.append(unit)
+            size += cost
+            if overlap and (heading or not text[start:end].isspace()):
+                overlap = False
+        if current and not overlap:
+            chunks.append((current[0][0], current[-1][1]))
+        return [span for span in (self._trim(text, start, end) for start, end in chunks) if span[0] < span[1]]
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.spans(text)]
+
+    def split_texts(self, texts: List[str]) -> List[List[str]]:
+        return [self.split_text(text) for text in texts]
+
+    def _overlap(self, text: str, current: list) -> list:
+        # 从块尾向前取句子，总量不超过 chunk_overlap，且至少留下一个不重叠的句子；
+        # 最后一行放不下时只在这一行里找句子边界
+        start, end, cost, _ = current[-1]
+        tail = current[:-1] + (self.segments(text, start, end) if cost > self.chunk_overlap else [current[-1]])
+        total = 0
+        index = len(tail)
+        while index > 1 and total + tail[index - 1][2] <= self.chunk_overlap:
+            index -= 1
+            total += tail[index][2]
+        return tail[index:]
+
+    def _hard_split(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        # 每段按实际开销二分出最长的窗口：并入的标题与正文的字符/单位比例不同，不能按平均值换算
+        cost = self.cost
+        pieces = []
+        position = start
+        while True:
+            stop = self._fit(text, position, end)
+            pieces.append((position, stop))
+            # 剩下的只有行尾空白时不再切出只含重叠内容的一段
+            if stop >= end or text[stop:end].isspace():
+                return pieces
+            # 下一段的起点：与本段重叠的部分不超过 chunk_overlap，且至少前进一个字符
+            low, high = position + 1, stop
+            while low < high:
+                middle = (low + high) // 2
+                if cost(text, middle, stop) <= self.chunk_overlap:
+                    high = middle
+                else:
+                    low = middle + 1
+            position = low
+
+    def _fit(self, text: str, start: int, end: int) -> int:
+        """The furthest stop in (start, end] with cost(text, start, stop) <= chunk_size."""
+        # 每个字符至少 1/LATIN_CHARS_PER_TOKEN 个单位，窗口不会超过这个长度
+        per_unit = LATIN_CHARS_PER_TOKEN if self.unit == "tokens" else 1
+        low, high = start + 1, min(end, start + self.chunk_size * per_unit)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.cost(text, start, middle) <= self.chunk_size:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    @staticmethod
+    def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+
+_default_chunker = None
+
+
+def default_chunker():
+    """The shared chunker used by `chunk_text`.
+
+    CHUNKER=span (default) uses SpanChunker sized in estimated tokens (CHUNK_SIZE, CHUNK_OVERLAP);
+    CHUNKER=langchain restores the RecursiveCharacterTextSplitter-based Chunker.
+    """
+    global _default_chunker
+    if _default_chunker is None:
+        if os.getenv("CHUNKER", "span") == "langchain":
+            _default_chunker = Chunker()
+        else:
+            _default_chunker = SpanChunker(
+                chunk_size=int(os.getenv("CHUNK_SIZE", "256")),
+                chunk_overlap=int(os.getenv("CHUNK_OVERLAP", "64")),
+                unit="tokens",
+            )
+    return _default_chunker
+
+
+def chunk_text(text: str) -> List[str]:
+    """Split `text` with the default chunker; module-level so it can run in a process pool."""
+    return default_chunker().split_text(text or "")
+
+
 if __name__ == '__main__':
 
     # 示例的 Markdown 文本（从 HTML 转换而来）
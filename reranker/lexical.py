@@ -0,0 +1,123 @@
+import asyncio
+import re
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from runtime.deadline import clamp
+from .base import BaseSemanticSearcher
+
+# 连续的中日韩字符按字 n-gram 切分，其余按单词切分
+TOKEN_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+|[a-z0-9]+(?:['.][a-z0-9]+)*")
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+
+def tokenize(text: str, ngram_range: Tuple[int, int] = (1, 2)) -> List[str]:
+    """Lowercased Latin words plus character n-grams of every CJK run."""
+    tokens = []
+    low, high = ngram_range
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        run = match.group()
+        if CJK_PATTERN.match(run):
+            for n in range(low, high + 1):
+                tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class BM25Reranker(BaseSemanticSearcher):
+    """In-process BM25 reranker; needs no embedding service.
+
+    Documents are tokenized into a sparse (document, term, tf) matrix held as flat NumPy
+    arrays, and each query is scored against it with vectorized operations.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, ngram_range: Tuple[int, int] = (1, 2)):
+        self.k1 = k1
+        self.b = b
+        self.ngram_range = ngram_range
+
+    async def calculate_scores(self, queries: List[str], documents: List[str]) -> np.ndarray:
+        return self.score(queries, documents)
+
+    def score(self, queries: List[str], documents: List[str]) -> np.ndarray:
+        """BM25 scores as a (len(queries), len(documents)) float32 array."""
+        n_docs = len(documents)
+        vocab: Dict[str, int] = {}
+        doc_ids, term_ids = [], []
+        for doc_id, document in enumerate(documents):
+            tokens = tokenize(document, self.ngram_range)
+            doc_ids.extend([doc_id] * len(tokens))
+            term_ids.extend(vocab.setdefault(token, len(vocab)) for token in tokens)
+
+        scores = np.zeros((len(queries), n_docs), dtype=np.float32)
+        if not vocab:
+            return scores
+
+        n_terms = len(vocab)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        flat = doc_ids * n_terms + np.asarray(term_ids, dtype=np.int64)
+        cells, tf = np.unique(flat, return_counts=True)
+        rows, cols = cells // n_terms, cells % n_terms
+
+        df = np.bincount(cols, minlength=n_terms)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        doc_len = np.bincount(doc_ids, minlength=n_docs)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(doc_len.mean(), 1e-9))
+        weights = idf[cols] * tf * (self.k1 + 1) / (tf + norm[rows])
+
+        for q, query in enumerate(queries):
+            query_terms = np.zeros(n_terms, dtype=np.float64)
+            for token in tokenize(query, self.ngram_range):
+                term = vocab.get(token)
+                if term is not None:
+                    query_terms[term] += 1
+            contrib = weights * query_terms[cols]
+            mask = contrib > 0
+            scores[q] = np.bincount(rows[mask], weights=contrib[mask], minlength=n_docs)
+        return scores
+
+
+class HybridReranker(BaseSemanticSearcher):
+    """Lexical pre-filter in front of an embedding reranker.
+
+    BM25 picks the `prefilter_top_n` best candidates per query and only those are sent to
+    `reranker`; the rest are ranked below them in lexical order. If the embedding call
+    fails or exceeds `timeout`, the lexical scores are used as they are.
+    """
+
+    def __init__(
+            self,
+            reranker: BaseSemanticSearcher,
+            prefilter: Optional[BM25Reranker] = None,
+            prefilter_top_n: int = 50,
+            timeout: Optional[float] = 5.0,
+    ):
+        self.reranker = reranker
+        self.prefilter = prefilter or BM25Reranker()
+        self.prefilter_top_n = prefilter_top_n
+        self.timeout = timeout
+
+    async def calculate_scores(self, queries: List[str], documents: List[str]) -> np.ndarray:
+        lexical = self.prefilter.score(queries, documents)
+        if len(documents) > self.prefilter_top_n:
+            top = np.argpartition(-lexical, self.prefilter_top_n - 1, axis=1)[:, :self.prefilter_top_n]
+            candidates = np.unique(top)
+        else:
+            candidates = np.arange(len(documents))
+
+        try:
+            dense = await asyncio.wait_for(
+                self.reranker.calculate_scores(queries, [documents[i] for i in candidates]),
+                clamp(self.timeout),
+            )
+        except Exception as e:
+            logger.warning(f"embedding rerank unavailable, using lexical scores: {e!r}")
+            return lexical
+
+        dense = np.asarray(dense, dtype=np.float32)
+        # 未进入候选的文档排在所有候选之后，彼此之间保持 BM25 顺序
+        floor = dense.min(axis=1, keepdims=True) - 2.0
+        scores = floor + lexical / (lexical.max(axis=1, keepdims=True) + 1e-9)
+        scores[:, candidates] = dense
+        return scores.astype(np.float32)
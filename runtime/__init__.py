@@ -0,0 +1,6 @@
+from .deadline import DeadlineExceeded, deadline_scope, remaining, clamp
+from .admission import AdmissionController, Overloaded, Ticket
+from .metrics import REGISTRY, span, observe, enable_tracing
+from .executor import CPUExecutor, LoopLagMonitor, get_executor
+
+__all__ = ["DeadlineExceeded", "deadline_scope", "remaining", "clamp", "AdmissionController", "Overloaded", "Ticket", "REGISTRY", "span", "observe", "enable_tracing", "CPUExecutor", "LoopLagMonitor", "get_executor"]
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from .deadline import clamp
+from .metrics import REGISTRY
+
+QUEUE_WAIT_SECONDS = REGISTRY.histogram("admission_queue_wait_seconds", "Time admitted requests spent queued.")
+
+
+class Overloaded(Exception):
+    """The request was shed; `status` is the HTTP status to answer with."""
+
+    def __init__(self, status: int, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted request's slot; `release` may be called more than once."""
+
+    def __init__(self, controller: "AdmissionController", queue_wait: float):
+        self.controller = controller
+        self.queue_wait = queue_wait
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release()
+
+
+class AdmissionController:
+    """Bounded admission in front of the request handlers.
+
+    At most `max_concurrency` requests run at once and at most `max_queue` wait for a slot.
+    A request arriving at a full queue is rejected at once with 429; a queued request that
+    does not get a slot within `queue_timeout` (or before its deadline) is rejected with
+    503. Rejecting early keeps latency stable for the requests that are admitted.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float = 10.0, window: int = 1024):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.queue_waits = deque(maxlen=window)
+
+    async def acquire(self) -> Ticket:
+        """Wait for a slot and return its Ticket. Raises Overloaded."""
+        start = time.perf_counter()
+        if not self.slots.locked():
+            # 有空闲名额时立即获得，不会挂起
+            await self.slots.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected_full += 1
+            raise Overloaded(429, "admission queue is full", retry_after=self.retry_after())
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.slots.acquire(), clamp(self.queue_timeout))
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise Overloaded(503, "timed out waiting for a free slot", retry_after=self.retry_after())
+            finally:
+                self.waiting -= 1
+        waited = time.perf_counter() - start
+        self.queue_waits.append(waited)
+        QUEUE_WAIT_SECONDS.observe(waited)
+        self.in_flight += 1
+        self.admitted += 1
+        return Ticket(self, waited)
+
+    def _release(self):
+        self.in_flight -= 1
+        self.slots.release()
+
+    @asynccontextmanager
+    async def admit(self):
+        ticket = await self.acquire()
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def retry_after(self) -> float:
+        # 以最近的排队时间估计多久后重试
+        return max(1.0, self.quantile(0.5) * 2)
+
+    def quantile(self, q: float) -> float:
+        if not self.queue_waits:
+            return 0.0
+        ordered = sorted(self.queue_waits)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "queue_wait_p50_ms": self.quantile(0.5) * 1000,
+            "queue_wait_p95_ms": self.quantile(0.95) * 1000,
+            "queue_wait_max_ms": max(self.queue_waits, default=0.0) * 1000,
+        }
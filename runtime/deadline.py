@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# 截止时间为 time.monotonic() 时刻，与 asyncio 默认事件循环的 loop.time() 一致
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request ran past its end-to-end deadline."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float] = None, at: Optional[float] = None):
+    """Set the request deadline for the enclosed code and every task it creates.
+
+    A nested scope can only shorten the deadline, never extend it.
+    """
+    if at is None and seconds is not None:
+        at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and (at is None or current < at):
+        at = current
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left until the request deadline (never negative), or `default` without one."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return max(0.0, deadline - time.monotonic())
+
+
+def clamp(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` shortened to the time left before the request deadline."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def check():
+    """Raise DeadlineExceeded when the request deadline has passed."""
+    if remaining(1.0) <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
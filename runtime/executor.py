@@ -0,0 +1,180 @@
+"""
+Run CPU-bound stages (SERP parsing, chunking) off the event loop.
+
+    pages = await get_executor().map(chunk_text, texts)
+
+`CPU_EXECUTOR` selects the backend: "thread" (default; lxml parsing releases the GIL),
+"process" (pure-Python work such as chunking runs in parallel, at the cost of pickling
+arguments) or "inline" (the old behaviour, handy when profiling). Functions sent to the
+pool must be module-level so that they pickle. `map` groups items into at most one batch
+per worker, so a request with twenty pages pays for a handful of round trips, not twenty,
+and inputs smaller than `inline_below` characters are not worth the hop at all.
+
+`LoopLagMonitor` measures how late the loop wakes up from a short sleep, which is how long
+something blocked it; lag is recorded in the `event_loop_lag_seconds` histogram.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence
+from loguru import logger
+from .metrics import REGISTRY
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop woke up from a short sleep, i.e. how long it was blocked.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+def _run_batch(fn: Callable, items: Sequence) -> list:
+    return [fn(item) for item in items]
+
+
+def _noop() -> int:
+    return os.getpid()
+
+
+def _size(item) -> int:
+    return len(item) if isinstance(item, (str, bytes)) else 0
+
+
+class CPUExecutor:
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None, inline_below: int = 20_000):
+        if mode not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        # 总字符数低于该值时直接在事件循环中执行，省去调度/序列化开销
+        self.inline_below = inline_below
+        self._pool: Optional[Executor] = None
+
+    @property
+    def pool(self) -> Optional[Executor]:
+        if self._pool is None and self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cpu")
+        elif self._pool is None and self.mode == "process":
+            # spawn 而不是 fork：父进程里有浏览器驱动和事件循环线程
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def warmup(self):
+        """Start the workers now instead of on the first request (process pools take a while to spawn)."""
+        if self.mode != "inline":
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.pool, _noop) for _ in range(self.max_workers)))
+
+    async def run(self, fn: Callable, *args, size: int = None) -> Any:
+        """`fn(*args)` in the pool; `size` (default: total length of str arguments) decides whether to stay inline."""
+        size = sum(_size(arg) for arg in args) if size is None else size
+        if self.mode == "inline" or size < self.inline_below:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def map(self, fn: Callable, items: Sequence, batch_size: Optional[int] = None) -> list:
+        """`[fn(item) for item in items]` in the pool, in order, with items sent in batches."""
+        items = list(items)
+        if not items:
+            return []
+        if self.mode == "inline" or sum(_size(item) for item in items) < self.inline_below:
+            return _run_batch(fn, items)
+        batch_size = batch_size or -(-len(items) // self.max_workers)
+        loop = asyncio.get_running_loop()
+        batches = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, _run_batch, fn, items[i:i + batch_size])
+            for i in range(0, len(items), batch_size)
+        ))
+        return [result for batch in batches for result in batch]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_executor: Optional[CPUExecutor] = None
+
+
+def get_executor() -> CPUExecutor:
+    """The process-wide executor, configured from CPU_EXECUTOR / CPU_WORKERS on first use."""
+    global _executor
+    if _executor is None:
+        workers = os.getenv("CPU_WORKERS")
+        _executor = CPUExecutor(
+            mode=os.getenv("CPU_EXECUTOR", "thread"),
+            max_workers=int(workers) if workers else None,
+            inline_below=int(os.getenv("CPU_INLINE_BELOW", "20000")),
+        )
+    return _executor
+
+
+def set_executor(executor: Optional[CPUExecutor]):
+    global _executor
+    if _executor is not None and _executor is not executor:
+        _executor.shutdown()
+    _executor = executor
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag every `interval` seconds while running.
+
+    Usage:
+        async with LoopLagMonitor() as monitor:
+            ...
+        print(monitor.stats())
+    """
+
+    def __init__(self, interval: float = 0.05, warn_after: float = 0.5, window: int = 1024):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.warn_after:
+                logger.warning(f"event loop was blocked for {lag * 1000:.0f}ms")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        ordered = sorted(self.samples)
+
+        def quantile(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else 0.0
+
+        return {
+            "samples": len(ordered),
+            "p50_ms": round(quantile(0.50), 2),
+            "p99_ms": round(quantile(0.99), 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
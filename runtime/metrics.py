@@ -0,0 +1,204 @@
+"""
+In-process metrics with Prometheus text exposition, plus optional OpenTelemetry spans.
+
+    with span("engine_parse", engine="bing"):
+        results = parse(html)
+
+Every span observes `stage_duration_seconds{stage=...}`; when tracing is enabled and the
+`opentelemetry` package is installed, it also opens an OpenTelemetry span of the same name.
+Metrics are per process: with several uvicorn workers each worker serves its own numbers.
+"""
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    # 完整精度输出；:g 只保留 6 位有效数字，大计数器在两次抓取之间会“停住”
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[LabelKey, float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, LabelKey, float, Optional[Tuple[str, str]]]]:
+        with self._lock:
+            items = list(self.values.items())
+        for key, value in items:
+            yield self.name, key, value, None
+
+
+class Gauge:
+    """A gauge whose values are read from `callback` at scrape time.
+
+    `callback` returns a list of (labels, value) pairs.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable[[], List[Tuple[dict, float]]]):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def samples(self):
+        for labels, value in self.callback():
+            yield self.name, _key(labels), float(value), None
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各桶计数..., 总和, 总数]
+        self.values: Dict[LabelKey, List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self.values.get(key)
+            if row is None:
+                row = self.values[key] = [0.0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(row)) for key, row in self.values.items()]
+        for key, row in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                yield f"{self.name}_bucket", key, cumulative, ("le", repr(bound))
+            yield f"{self.name}_bucket", key, row[-1], ("le", "+Inf")
+            yield f"{self.name}_sum", key, row[-2], None
+            yield f"{self.name}_count", key, row[-1], None
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self._lock = Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], List[Tuple[dict, float]]]) -> Gauge:
+        # 重复注册时以新的回调为准（例如 lifespan 重新创建了池）
+        gauge = Gauge(name, help, callback)
+        with self._lock:
+            self.metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, key, value, extra in metric.samples():
+                    lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e!r}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("stage_duration_seconds", "Duration of each pipeline stage.")
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens sent to and received from the chat model.")
+
+_tracer = None
+
+
+def enable_tracing(name: str = "web-search") -> bool:
+    """Open an OpenTelemetry span for every `span()`; returns False without opentelemetry.
+
+    Exporters are configured the usual OpenTelemetry way (SDK setup or `opentelemetry-instrument`).
+    """
+    global _tracer
+    if otel_trace is None:
+        return False
+    _tracer = otel_trace.get_tracer(name)
+    return True
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """Time the enclosed block as `stage`; labels become Prometheus labels and span attributes."""
+    start = time.perf_counter()
+    if _tracer is None:
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
+        return
+    with _tracer.start_as_current_span(stage, attributes={k: str(v) for k, v in labels.items()}):
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
+
+
+def observe(stage: str, seconds: float, **labels):
+    """Record a stage duration measured elsewhere."""
+    STAGE_SECONDS.observe(seconds, stage=stage, **labels)
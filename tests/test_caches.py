@@ -0,0 +1,69 @@
+import asyncio
+
+from caches import CachedSearch, ContentCache, SerpCache, SQLiteStore
+
+
+class FakeSearch:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    async def response(self, questions):
+        self.calls.append(list(questions))
+        return {q: [{"url": f"https://example.com/{q}"}] for q in questions}
+
+
+def test_serp_cache_serves_repeats_from_store(tmp_path):
+    async def main():
+        store = SQLiteStore(str(tmp_path / "serp.sqlite"), table="serp")
+        search = FakeSearch()
+        await CachedSearch(search, SerpCache(store=store)).response(["a", "b"])
+        # 新的 SerpCache 内存为空，只能从 SQLite 读到
+        cache = SerpCache(store=store)
+        result = await CachedSearch(search, cache).response(["a", "c"])
+        return search.calls, result, cache.stats()
+
+    calls, result, stats = asyncio.run(main())
+    assert calls == [["a", "b"], ["c"]]
+    assert set(result) == {"a", "c"}
+    assert stats["disk_hits"] == 1 and stats["disk_bytes"] > 0
+
+
+def test_content_cache_roundtrip(tmp_path):
+    async def main():
+        cache = ContentCache(SQLiteStore(str(tmp_path / "content.sqlite"), table="content"))
+        await cache.set("https://example.com/a?utm_source=x", {"url": "https://example.com/a", "content": "hi"})
+        return await cache.get("https://example.com/a"), await cache.get("https://example.com/b"), cache
+
+    page, missing, cache = asyncio.run(main())
+    assert page["content"] == "hi" and missing is None
+    assert cache.contains("https://example.com/a")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_embedding_cache_does_not_wait_for_the_write_lock(tmp_path):
+    import sqlite3
+    import time
+
+    import numpy as np
+
+    from caches import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many("m", ["a"], np.ones((1, 4), dtype=np.float32))
+    # 另一个进程持有写锁时：打开已初始化的目录、读取和刷新 last_used 都不等待
+    other = sqlite3.connect(str(tmp_path / "index.sqlite"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        reopened = EmbeddingCache(str(tmp_path))
+        vectors = reopened.get_many("m", ["a", "b"])
+        assert time.perf_counter() - start < 2.0
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert vectors[0].tolist() == [1.0] * 4 and vectors[1] is None
+    assert reopened.stats()["hit_rate"] == 0.5
+    reopened.close()
+    cache.close()
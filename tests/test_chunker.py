@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from reranker.chunker import SpanChunker
+
+CJK = "天气预报显示明天广州多云转雷阵雨气温二十六到三十三度南风三级空气质量良"
+LATIN = "the quick brown fox jumps over the lazy dog while markdown pages keep growing".split()
+
+
+def random_document(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(1, 30)):
+        kind = rng.random()
+        if kind < 0.15:
+            lines.append("#" * rng.randint(1, 3) + " " + "".join(rng.choices(CJK, k=rng.randint(1, 8))))
+        elif kind < 0.45:
+            sentences = ["".join(rng.choices(CJK, k=rng.randint(1, 40))) + rng.choice("。！？；") for _ in range(rng.randint(1, 6))]
+            lines.append("".join(sentences))
+        elif kind < 0.75:
+            sentences = [" ".join(rng.choices(LATIN, k=rng.randint(1, 25))) + rng.choice(".!?") for _ in range(rng.randint(1, 6))]
+            lines.append(" ".join(sentences))
+        elif kind < 0.9:
+            # 没有标点的超长行，只能硬切
+            lines.append(rng.choice(["a", "中", "ab中"]) * rng.randint(50, 600))
+        else:
+            lines.append("")
+    return rng.choice(["\n", "\n\n"]).join(lines)
+
+
+def check_invariants(chunker: SpanChunker, text: str):
+    spans = chunker.spans(text)
+    for start, end in spans:
+        assert chunker.cost(text, start, end) <= chunker.chunk_size, (start, end)
+    covered = bytearray(len(text))
+    for start, end in spans:
+        covered[start:end] = b"\x01" * (end - start)
+    missing = [i for i, char in enumerate(text) if not char.isspace() and not covered[i]]
+    assert not missing, missing[:10]
+    for (_, previous_end), (next_start, _) in zip(spans, spans[1:]):
+        if next_start < previous_end:
+            # 与上一块重叠时，紧接着的新内容不能是标题
+            assert not text[previous_end:].lstrip().startswith("#")
+
+
+def test_heading_before_oversized_line_stays_within_limit():
+    chunker = SpanChunker(50, 10, "tokens")
+    text = "# 标题\n正文第一句。\n## 二\n" + "a" * 500
+    check_invariants(chunker, text)
+
+
+@pytest.mark.parametrize("unit", ["chars", "tokens"])
+def test_random_documents(unit):
+    rng = random.Random(20260101)
+    for _ in range(300):
+        size = rng.randint(8, 160)
+        chunker = SpanChunker(size, rng.randint(0, size - 1), unit)
+        check_invariants(chunker, random_document(rng))
+
+
+def test_heading_starts_a_chunk_without_overlap():
+    text = "正文。" * 30 + "\n# 新章节\n" + "内容。" * 5
+    spans = SpanChunker(40, 20, "tokens").spans(text)
+    heading = text.index("# 新章节")
+    assert any(start == heading for start, _ in spans)
+
+
+def test_empty_and_blank():
+    chunker = SpanChunker(50, 10)
+    assert chunker.spans("") == []
+    assert chunker.spans(" \n\n ") == []
@@ -0,0 +1,16 @@
+from agent.compaction import TokenLedger, compact
+
+
+def test_compact_returns_its_own_ledger_entry():
+    with TokenLedger() as ledger:
+        _, first = compact("link_parser", [{"url": "https://a.com", "content": "x" * 400}], 1000)
+        _, second = compact("web_search", {"q": [{"url": "https://b.com", "title": "b"}]}, 1000)
+    assert first["tool"] == "link_parser"
+    assert second["tool"] == "web_search"
+    assert ledger.calls == [first, second]
+
+
+def test_compact_without_ledger():
+    text, entry = compact("web_search", {"q": []}, 100)
+    assert entry is None
+    assert isinstance(text, str)
@@ -0,0 +1,65 @@
+import asyncio
+
+from pools import CrawlScheduler, InstancePool
+
+
+class FakeCrawler:
+    def __init__(self):
+        self.crawled = []
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def healthy(self):
+        return True
+
+    def rss(self):
+        return None
+
+    async def run_one(self, url):
+        self.crawled.append(url)
+        await asyncio.sleep(0.01)
+        return {"url": url, "content": "ok"}
+
+
+class FakePool(InstancePool):
+    name = "fake"
+
+    async def _new_instance(self):
+        return FakeCrawler()
+
+    def get_crawler(self):
+        return self.checkout()
+
+
+def test_only_idle_crawlers_are_borrowed():
+    async def main():
+        pool = FakePool(4, min_size=1, idle_timeout=0)
+        await pool.start()
+        scheduler = CrawlScheduler(pool, per_crawler=1, domain_interval=0)
+        urls = [f"https://site{i}.example/" for i in range(4)]
+        pages = [page async for page in scheduler.stream(urls)]
+        await pool.cleanup()
+        return pages, pool.created
+
+    pages, created = asyncio.run(main())
+    # 只有一个空闲实例：批量再大也不为借用而扩容
+    assert len(pages) == 4
+    assert created == 1
+
+
+def test_domain_stats_are_bounded():
+    async def main():
+        pool = FakePool(1, idle_timeout=0)
+        await pool.start()
+        scheduler = CrawlScheduler(pool, domain_interval=0, max_domains=3)
+        urls = [f"https://site{i}.example/" for i in range(5)]
+        async for _ in scheduler.stream(urls):
+            pass
+        await pool.cleanup()
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert len(scheduler.domains) == 3
+    assert len(scheduler.stats(top=2)) == 2
+    assert len(scheduler._domain_next_start) <= 3
@@ -0,0 +1,26 @@
+import asyncio
+
+import numpy as np
+
+from reranker.base import BaseSemanticSearcher
+from reranker.lexical import BM25Reranker, HybridReranker
+
+
+class FailingReranker(BaseSemanticSearcher):
+    async def calculate_scores(self, queries, documents):
+        raise RuntimeError("embedding service down")
+
+
+DOCUMENTS = ["上海天气晴朗", "python asyncio tutorial", "北京天气预报 明天有雨"]
+
+
+def test_bm25_ranks_without_embeddings():
+    ranked = asyncio.run(BM25Reranker().get_reranked_documents("北京天气", DOCUMENTS, top_k=2))
+    assert ranked[0] == "北京天气预报 明天有雨"
+    assert len(ranked) == 2
+
+
+def test_hybrid_falls_back_to_lexical_scores():
+    reranker = HybridReranker(FailingReranker())
+    scores = asyncio.run(reranker.calculate_scores(["asyncio"], DOCUMENTS))
+    assert int(np.argmax(scores[0])) == 1
@@ -0,0 +1,67 @@
+import asyncio
+
+from engines import meta
+from engines.meta import LatencyTracker, MetaSearch
+
+
+class FakeEngine:
+    delay = 0.0
+    events = []
+
+    def __init__(self, browser_pool=None, **kwargs):
+        pass
+
+    async def response(self, questions):
+        loop = asyncio.get_running_loop()
+        self.events.append((self.name, "start", loop.time()))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.events.append((self.name, "cancelled", loop.time()))
+            raise
+        return {q: [{"url": f"https://{self.name}.example/{q}", "title": q}] for q in questions}
+
+
+class SlowEngine(FakeEngine):
+    name = "slow"
+    delay = 5.0
+
+
+class FastEngine(FakeEngine):
+    name = "fast"
+    delay = 0.01
+
+
+def test_hedge_returns_first_answer_and_cancels_slow_engine(monkeypatch):
+    monkeypatch.setitem(meta.ENGINES, "slow", SlowEngine)
+    monkeypatch.setitem(meta.ENGINES, "fast", FastEngine)
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record("slow", 0.1)
+    monkeypatch.setattr(meta, "latency_tracker", tracker)
+    FakeEngine.events = []
+
+    async def main():
+        search = MetaSearch(None, engines=("slow", "fast"), quorum=2, hedge=True)
+        start = asyncio.get_running_loop().time()
+        results = await search.response(["q"])
+        return start, asyncio.get_running_loop().time() - start, results
+
+    start, elapsed, results = asyncio.run(main())
+    events = {(name, kind): at - start for name, kind, at in FakeEngine.events}
+    # 备用引擎在主引擎的 p90 之后才启动；拿到第一个结果即返回并取消慢的引擎
+    assert events[("fast", "start")] >= 0.1
+    assert ("slow", "cancelled") in events
+    assert elapsed < 1.0
+    assert [item["url"] for item in results["q"]] == ["https://fast.example/q"]
+
+
+def test_search_options_from_env(monkeypatch):
+    monkeypatch.setenv("SEARCH_FETCH_MODE", "bing:direct, baidu:browser")
+    monkeypatch.setenv("META_ENGINES", "bing,baidu")
+    monkeypatch.setenv("META_HEDGE", "1")
+    assert meta.search_options_from_env("bing") == {"fetch_mode": "direct"}
+    assert meta.search_options_from_env("sougou") == {}
+    options = meta.search_options_from_env("meta")
+    assert options["engines"] == ["bing", "baidu"]
+    assert options["hedge"] is True
+    assert options["engine_options"]["bing"] == {"fetch_mode": "direct"}
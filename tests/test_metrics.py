@@ -0,0 +1,22 @@
+from runtime.metrics import Registry
+
+
+def test_render_keeps_full_precision():
+    registry = Registry()
+    counter = registry.counter("tokens_total", "Tokens.")
+    counter.inc(1234567, kind="prompt")
+    counter.inc(1, kind="prompt")
+    histogram = registry.histogram("stage_seconds", "Stages.", buckets=(0.5,))
+    histogram.observe(0.25)
+    text = registry.render()
+    assert 'tokens_total{kind="prompt"} 1234568.0' in text
+    assert 'stage_seconds_bucket{le="+Inf"} 1.0' in text
+    assert "stage_seconds_sum 0.25" in text
+
+
+def test_render_special_values():
+    registry = Registry()
+    registry.gauge("ratio", "Ratio.", lambda: [({"kind": "a"}, float("nan")), ({"kind": "b"}, float("inf"))])
+    text = registry.render()
+    assert 'ratio{kind="a"} NaN' in text
+    assert 'ratio{kind="b"} +Inf' in text
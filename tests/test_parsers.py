@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from lxml import html as lxml_html
+
+from bench.fixture_server import FIXTURE_DIR
+from bench.parse import BASE, ENGINES, legacy_sougou
+from engines import BaiduSearch, SougouSearch
+
+
+def fixture(name: str, query: str = "广州天气") -> str:
+    return (FIXTURE_DIR / name).read_text(encoding="utf-8").replace("{base}", BASE).replace("{query}", query)
+
+
+def engine(cls):
+    instance = cls(browser_pool=None)
+    instance.base_url = BASE
+    return instance
+
+
+def canonical(results):
+    return sorted(json.dumps(result, sort_keys=True, ensure_ascii=False) for result in results)
+
+
+@pytest.mark.parametrize("cls, name, legacy", ENGINES, ids=[cls.name for cls, _, _ in ENGINES])
+def test_spec_matches_legacy_parser(cls, name, legacy):
+    html = fixture(name)
+    results = engine(cls).parsing(html)
+    expected = legacy(html, BASE)
+    assert results
+    if cls is BaiduSearch:
+        # 旧实现用 set 去重，顺序不固定，只比较内容
+        assert canonical(results) == canonical(expected)
+    else:
+        assert results == expected
+
+
+def test_baidu_keeps_page_order():
+    html = fixture("baidu_serp.html")
+    links = lxml_html.document_fromstring(html).cssselect("div.c-container a.siteLink_9TPP3")
+    page_order = list(dict.fromkeys(link.get("href") for link in links))
+    assert [result["url"] for result in engine(BaiduSearch).parsing(html)] == page_order
+
+
+def test_sougou_relative_links_and_time():
+    html = fixture("sougou_serp.html").replace(
+        f'href="{BASE}/articles/2"', 'href="/link?url=abc"'
+    ).replace("关于", "3天前-关于", 1)
+    results = engine(SougouSearch).parsing(html)
+    assert results == legacy_sougou(html, BASE)
+    assert results[1]["url"] == f"{BASE}/link?url=abc"
+    assert results[1]["time"] == "3天前"
+
+
+def test_empty_page():
+    for cls, _, _ in ENGINES:
+        assert engine(cls).parsing("") == []
+
+
+@pytest.mark.parametrize("base", ["http://127.0.0.1:9000", "http://127.0.0.1:9000/"])
+def test_base_url_env_is_normalized(monkeypatch, base):
+    monkeypatch.setenv("BAIDU_BASE_URL", base)
+    search = BaiduSearch(browser_pool=None)
+    assert search.base_url == "http://127.0.0.1:9000"
+    assert search.search_url("天气") == "http://127.0.0.1:9000/s?wd=%E5%A4%A9%E6%B0%94"
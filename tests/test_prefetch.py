@@ -0,0 +1,25 @@
+import asyncio
+
+from agent.prefetch import merge_pages
+
+
+async def crawl(urls):
+    for url in urls:
+        await asyncio.sleep(0.01)
+        yield {"url": url, "content": "crawled"}
+
+
+async def collect(futures, stream):
+    return {page["url"]: page["content"] async for page in merge_pages(futures, stream, crawl)}
+
+
+def test_failed_prefetches_are_recrawled():
+    async def main():
+        loop = asyncio.get_running_loop()
+        done, failed, cancelled = loop.create_future(), loop.create_future(), loop.create_future()
+        loop.call_later(0.02, done.set_result, {"url": "a", "content": "prefetched"})
+        loop.call_later(0.03, failed.set_result, None)
+        loop.call_later(0.01, cancelled.cancel)
+        return await collect({"a": done, "b": failed, "c": cancelled}, crawl(["d"]))
+
+    assert asyncio.run(main()) == {"a": "prefetched", "b": "crawled", "c": "crawled", "d": "crawled"}
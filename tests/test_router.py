@@ -0,0 +1,24 @@
+from agent.router import extract_urls, route
+
+
+def test_route_plain_url():
+    call = route("https://example.com/a")
+    assert call["name"] == "link_parser"
+    assert call["args"] == {"urls": ["https://example.com/a"]}
+
+
+def test_route_url_with_question():
+    call = route("总结一下 https://example.com/a 的要点")
+    assert call["args"]["urls"] == ["https://example.com/a"]
+    assert call["args"]["query"] == "总结一下 的要点"
+
+
+def test_route_without_url_falls_back_to_model():
+    assert route("今天的新闻") is None
+
+
+def test_malformed_ipv6_host_is_skipped():
+    assert route("http://[abc") is None
+    assert route("see http://[::1 ok") is None
+    urls, _ = extract_urls("http://[abc https://example.com/b")
+    assert urls == ["https://example.com/b"]